@@ -0,0 +1,99 @@
+import argparse
+import glob
+from utils import read_instance
+from packed_instances import MAGIC, read_instances
+from result_sink import ResultSink
+from progress import use_progress_bar
+from tabu_search import run_tabu_search, TABU_LENGTH, PAIRWISE, CRITICAL
+from simulated_anneling import run_simulated_anneling, COOLING_SCHEDULES, RESTARTS
+from genetic import run_genetic_algorithm, run_island_genetic_algorithm, POPSIZE, ROULETTE, TOURNAMENT, RING, FULLY_CONNECTED
+
+TABU = 'tabu'
+SA = 'sa'
+GA = 'ga'
+ISLAND = 'island'
+
+SOLVERS = {TABU: run_tabu_search, SA: run_simulated_anneling, GA: run_genetic_algorithm, ISLAND: run_island_genetic_algorithm}
+# name of the iteration budget in each solver's signature
+ITERATIONS = {TABU: 'iterations', SA: 'iterations', GA: 'num_iters', ISLAND: 'num_iters'}
+
+
+def is_packed(filename):
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def iter_instances(patterns):
+    """Yield `(name, instance)` for every file matching `patterns`; a packed
+    file yields each of its instances as `file:index`."""
+    for pattern in patterns:
+        for filename in sorted(glob.glob(pattern)):
+            if is_packed(filename):
+                for k, instance in enumerate(read_instances(filename)):
+                    yield f"{filename}:{k}", instance
+            else:
+                yield filename, read_instance(filename)
+
+
+def solver_options(args):
+    options = {'cache_size': args.cache_size, 'time_limit': args.time_limit, 'patience': args.patience, 'stats': args.stats}
+    if args.iterations is not None:
+        options[ITERATIONS[args.algorithm]] = args.iterations
+    if args.algorithm == TABU:
+        options.update(tabu_length=args.tabu_length, neighborhood=args.neighborhood, workers=args.workers)
+    elif args.algorithm == SA:
+        options.update(restarts=args.restarts, workers=args.workers, seed=args.seed, cooling=args.cooling)
+    elif args.algorithm == GA:
+        options.update(pop_size=args.pop_size, restarts=args.restarts, workers=args.workers, seed=args.seed, selection_method=args.selection)
+    else:
+        options.update(pop_size=args.pop_size, islands=args.workers, topology=args.topology, seed=args.seed, selection_method=args.selection)
+    return options
+
+
+def run_batch(args):
+    solver = SOLVERS[args.algorithm]
+    options = solver_options(args)
+    sink = ResultSink(args.output, resume=args.resume)
+    completed = sink.completed()
+    for name, (n, m, processing_times, ub, lb) in iter_instances(args.instances):
+        if name in completed:
+            continue
+        data = solver(n, m, processing_times, ub=ub, lb=lb, **options)
+        data['algorithm'] = args.algorithm
+        sink.write(name, data)
+        print(f"{name}: makespan {data['makespan']} lb {data['lowerbound']} runtime {data['runtime']:.2f}s", flush=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Solve open-shop instances without the Streamlit UI.")
+    parser.add_argument("algorithm", choices=list(SOLVERS))
+    parser.add_argument("instances", nargs="+", help="instance files or globs, text or packed")
+    parser.add_argument("--output", default=None, help="JSON-Lines result file (default results/batch_{algorithm}.jsonl)")
+    parser.add_argument("--resume", action="store_true", help="skip instances already in the output")
+    parser.add_argument("--iterations", type=int, default=None, help="iterations (tabu, sa) or generations (ga, island)")
+    parser.add_argument("--workers", type=int, default=1, help="processes; 0 uses every CPU (islands for 'island')")
+    parser.add_argument("--restarts", type=int, default=RESTARTS)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds per run")
+    parser.add_argument("--patience", type=int, default=None)
+    parser.add_argument("--cache-size", type=int, default=0)
+    parser.add_argument("--tabu-length", type=int, default=TABU_LENGTH)
+    parser.add_argument("--neighborhood", choices=[PAIRWISE, CRITICAL], default=PAIRWISE)
+    parser.add_argument("--cooling", choices=list(COOLING_SCHEDULES), default='geometric')
+    parser.add_argument("--pop-size", type=int, default=POPSIZE)
+    parser.add_argument("--selection", choices=[ROULETTE, TOURNAMENT], default=ROULETTE)
+    parser.add_argument("--topology", choices=[RING, FULLY_CONNECTED], default=RING)
+    parser.add_argument("--progress", action="store_true", help="show tqdm progress bars")
+    parser.add_argument("--stats", action="store_true", help="record counters, phase timers and convergence traces")
+    args = parser.parse_args(argv)
+    if args.output is None:
+        args.output = f"results/batch_{args.algorithm}.jsonl"
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.progress:
+        from tqdm import tqdm
+        use_progress_bar(tqdm)
+    run_batch(args)
@@ -0,0 +1,242 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import numpy as np
+import kernels
+from decoder import Decoder
+from instance_generator import get_processing_times
+from packed_instances import load_test_instances
+from stopping import StoppingRule, LOWER_BOUND
+from tabu_search import scheduling, pairwise_exchange_neighborhood, critical_neighborhood, scan_moves, swap_move, tabu_search, TabuList, TABU_LENGTH
+from simulated_anneling import simulated_annealing
+from genetic import Individual, population_fitness, random_population, crossover, batch_crossover, ga_permutation, CROSSOVER_RATE, MUTATION_RATE
+
+SEED = 12345
+SAMPLES = 20
+MIN_TIME = 0.2
+REPEATS = 5
+# every end-to-end run is deterministic for its seed, so the fastest repeat is kept
+MACRO_REPEATS = 3
+TARGET_GAP = 0.05
+# time-to-target differences below this many seconds are timer noise
+TIME_FLOOR = 0.05
+SUITES = [4, 5, 7, 15]
+# (tabu iterations, annealing iterations, GA generations, GA population) per suite
+BUDGETS = {4: (200, 5000, 100, 50), 5: (200, 5000, 100, 50), 7: (300, 20000, 200, 100), 15: (100, 20000, 100, 100)}
+# sizes beyond the benchmark files are generated with fixed Taillard seeds
+GENERATED_SIZES = [30]
+# refresh after an intended performance change, on the machine the checks run on:
+#   python benchmark.py --save results/benchmark_baseline.json
+BASELINE = "results/benchmark_baseline.json"
+
+
+def rate(func, count, min_time=MIN_TIME, repeats=REPEATS):
+    """Best evaluations per second of `func()`, which performs `count`
+    evaluations, over `repeats` timed batches of at least `min_time` seconds."""
+    func()  # warm-up, also compiles the numba kernels
+    best = 0.0
+    for _ in range(repeats):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            func()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, calls*count/elapsed)
+    return best
+
+
+def micro_instances(suites):
+    for size in suites:
+        if size in GENERATED_SIZES:
+            yield size, get_processing_times(size, size, SEED, SEED+1)
+        else:
+            yield size, load_test_instances(size, size, count=1)[0][2]
+
+
+def micro_benchmarks(suites=SUITES+GENERATED_SIZES, min_time=MIN_TIME):
+    """Evaluations per second of the hot kernels, keyed `kernel/size`."""
+    results = {}
+    for size, processing_times in micro_instances(suites):
+        n, m = len(processing_times), len(processing_times[0])
+        random.seed(SEED)
+        rng = np.random.default_rng(SEED)
+        decoder = Decoder(processing_times)
+        schedules = [[random.sample(range(n), n) for _ in range(m)] for _ in range(SAMPLES)]
+        codes = random_population(SAMPLES, n, m)
+        schedule = scheduling(processing_times)
+        moves = list(pairwise_exchange_neighborhood(schedule))
+        critical = critical_neighborhood(decoder.critical_path(schedule), n)
+        tabu_list = TabuList(TABU_LENGTH, n, m)
+        individual = Individual.__new__(Individual)
+        children = np.empty_like(codes[:2])
+
+        def makespan():
+            for s in schedules:
+                decoder.makespan(s)
+
+        def makespan_from():
+            decoder.trace(schedule)
+            for move in moves:
+                swap_move(schedule, move)
+                decoder.makespan_from(schedule, min(move[1], move[2]), move)
+                swap_move(schedule, move)
+
+        def calc_fitness():
+            for code in codes:
+                individual.code = code
+                individual.calc_fitness(processing_times, n, m)
+
+        def neighborhood():
+            scan_moves(decoder, schedule, pairwise_exchange_neighborhood(schedule), tabu_list, 0, 0)
+
+        def critical_scan():
+            scan_moves(decoder, schedule, critical_neighborhood(decoder.critical_path(schedule), n), tabu_list, 0, 0)
+
+        def single_crossover():
+            for i in range(0, SAMPLES, 2):
+                crossover(codes[i], codes[i+1], children[0], children[1])
+
+        benchmarks = [
+            ('makespan', makespan, SAMPLES),
+            ('makespan_from', makespan_from, len(moves)),
+            ('calc_fitness', calc_fitness, SAMPLES),
+            ('population_fitness', lambda: population_fitness(codes, processing_times), SAMPLES),
+            ('pairwise_exchange_neighborhood', neighborhood, len(moves)),
+            ('critical_neighborhood', critical_scan, len(critical)),
+            ('crossover', single_crossover, SAMPLES),
+            ('batch_crossover', lambda: batch_crossover(codes[0::2], codes[1::2], rng), SAMPLES),
+        ]
+        for name, func, count in benchmarks:
+            results[f"{name}/{size}"] = rate(func, count, min_time=min_time)
+    return results
+
+
+def target(ub, lb, gap=TARGET_GAP):
+    # within `gap` of the best known makespan, or of the bound without one
+    return int((ub or lb)*(1+gap))
+
+
+def timed_run(solve, goal, seed, repeats=MACRO_REPEATS):
+    elapsed = None
+    for _ in range(repeats):
+        random.seed(seed)
+        stopping = StoppingRule(lower_bound=goal)
+        start = time.perf_counter()
+        makespan = solve(stopping)
+        run_time = time.perf_counter() - start
+        elapsed = run_time if elapsed is None else min(elapsed, run_time)
+    reached = stopping.reason == LOWER_BOUND
+    return {'makespan': int(makespan), 'elapsed': elapsed, 'target': goal, 'time_to_target': elapsed if reached else None}
+
+
+def warm_up(suites=SUITES):
+    # load or compile the numba kernels before anything is timed
+    rng = np.random.default_rng(SEED)
+    for size in suites:
+        n, m, processing_times, ub, lb = load_test_instances(size, size, count=1)[0]
+        decoder = Decoder(processing_times)
+        schedule = scheduling(processing_times)
+        decoder.makespan(schedule)
+        decoder.trace(schedule)
+        decoder.makespan_from(schedule, 0)
+        decoder.critical_path(schedule)
+        codes = random_population(2, n, m)
+        population_fitness(codes, processing_times)
+        batch_crossover(codes[:1], codes[1:], rng)
+
+
+def macro_benchmarks(suites=SUITES, instances=3):
+    """End-to-end runs of the three solvers on the first `instances` files
+    of every suite, each from a fixed seed, keyed `algorithm/test{n}{m}{i}`.
+    A run stops once it reaches the target, so `time_to_target` is its
+    elapsed time; otherwise the full budget is spent and it stays None."""
+    suites = [size for size in suites if size in SUITES]
+    warm_up(suites)
+    results = {}
+    for size in suites:
+        tabu_iterations, sa_iterations, generations, pop_size = BUDGETS[size]
+        for i, (n, m, processing_times, ub, lb) in enumerate(load_test_instances(size, size, count=instances)):
+            goal = target(ub, lb)
+            solvers = {
+                'tabu': lambda stopping: tabu_search(n, m, processing_times, TABU_LENGTH, tabu_iterations, scheduling(processing_times), ub, stopping=stopping)[0],
+                'simulated_annealing': lambda stopping: simulated_annealing(n, m, processing_times, sa_iterations, stopping=stopping)[0],
+                'genetic': lambda stopping: ga_permutation(pop_size, generations, CROSSOVER_RATE, MUTATION_RATE, int(0.2*pop_size), n, m, processing_times, stopping=stopping)[1],
+            }
+            for algorithm, solve in solvers.items():
+                results[f"{algorithm}/test{n}{m}{i}"] = timed_run(solve, goal, SEED+i)
+    return results
+
+
+def environment():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'backend': kernels.get_backend(),
+            'machine': platform.machine(), 'processor': platform.processor(), 'cpus': os.cpu_count()}
+
+
+def compare(current, baseline, tolerance=0.25):
+    """Regressions of `current` against `baseline`: kernel rates more than
+    `tolerance` slower, worse makespans, and targets reached later or lost."""
+    regressions = []
+    for key, old in baseline.get('micro', {}).items():
+        new = current.get('micro', {}).get(key)
+        if new is not None and new < old*(1-tolerance):
+            regressions.append(f"{key}: {new:.0f}/s, baseline {old:.0f}/s")
+    for key, old in baseline.get('macro', {}).items():
+        new = current.get('macro', {}).get(key)
+        if new is None:
+            continue
+        if new['makespan'] > old['makespan']:
+            regressions.append(f"{key}: makespan {new['makespan']}, baseline {old['makespan']}")
+        if old['time_to_target'] is not None:
+            if new['time_to_target'] is None:
+                regressions.append(f"{key}: target {old['target']} no longer reached")
+            elif new['time_to_target'] > old['time_to_target']*(1+tolerance) + TIME_FLOOR:
+                regressions.append(f"{key}: time to target {new['time_to_target']:.3f}s, baseline {old['time_to_target']:.3f}s")
+    if current.get('environment') != baseline.get('environment'):
+        regressions.append("note: baseline was recorded in a different environment")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Micro- and end-to-end benchmarks of the solvers.")
+    parser.add_argument("--micro", action="store_true", help="only the kernel benchmarks")
+    parser.add_argument("--macro", action="store_true", help="only the end-to-end suites")
+    parser.add_argument("--suites", type=int, nargs="+", default=SUITES+GENERATED_SIZES, choices=SUITES+GENERATED_SIZES,
+                        help="instance sizes; generated sizes only have kernel benchmarks")
+    parser.add_argument("--instances", type=int, default=3, help="instances per end-to-end suite")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME, help="seconds per timed kernel batch")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save", default=None, help=f"write the results as a JSON baseline, e.g. {BASELINE}")
+    parser.add_argument("--compare", nargs="?", const=BASELINE, default=None,
+                        help=f"baseline JSON to check for regressions (default {BASELINE})")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = {'environment': environment()}
+    if not args.macro:
+        results['micro'] = micro_benchmarks(suites=args.suites, min_time=args.min_time)
+        for key, value in results['micro'].items():
+            print(f"{key:40} {value:14.0f} evals/s")
+    if not args.micro:
+        results['macro'] = macro_benchmarks(suites=args.suites, instances=args.instances)
+        for key, value in results['macro'].items():
+            reached = "-" if value['time_to_target'] is None else f"{value['time_to_target']:.3f}s"
+            print(f"{key:40} makespan {value['makespan']:6} target {value['target']:6} time to target {reached:>9} elapsed {value['elapsed']:.3f}s")
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=1)
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            regressions = compare(results, json.load(f), tolerance=args.tolerance)
+        for regression in regressions:
+            print(regression)
+        if any(not regression.startswith("note:") for regression in regressions):
+            sys.exit(1)
@@ -0,0 +1,19 @@
+import numpy as np
+
+
+def lower_bound(processing_times):
+    """Classic open-shop bound: no schedule is shorter than the longest job
+    or the busiest machine."""
+    times = np.asarray(processing_times)
+    return int(max(times.sum(axis=1).max(), times.sum(axis=0).max()))
+
+
+def solved_by_heuristic(schedule, processing_times, lb):
+    """`(makespan, sequence)` of `schedule` when it already reaches the lower
+    bound `lb`, so it is optimal and there is nothing left to search; else None."""
+    # imported here so loading instances through utils never pulls in numba
+    from decoder import Decoder
+    makespan, sequence = Decoder(processing_times).makespan(schedule)
+    if makespan <= lb:
+        return makespan, sequence
+    return None
@@ -0,0 +1,186 @@
+import numpy as np
+import kernels
+
+
+class Decoder():
+    """Array-backed makespan decoder shared by tabu search and simulated annealing.
+
+    The row/column sums of the instance are computed once, and the per-call
+    state lives in preallocated integer lists that are reset on every decode
+    instead of rebuilding Job/Machine objects. When the numba backend is
+    selected in `kernels`, decoding runs in the compiled `decode_columns`.
+    """
+
+    def __init__(self, processing_times):
+        self.n = len(processing_times)
+        self.m = len(processing_times[0])
+        # times[machine][job], so a machine row of the schedule indexes a single list
+        self.times = [[int(processing_times[i][j]) for i in range(self.n)] for j in range(self.m)]
+        self.job_times = [sum(int(t) for t in processing_times[i]) for i in range(self.n)]
+        self.machine_times = [sum(self.times[j]) for j in range(self.m)]
+        self.machine_available = [0]*self.m
+        self.machine_remaining = [0]*self.m
+        self.job_available = [0]*self.n
+        self.job_remaining = [0]*self.n
+        self.checkpoints = []
+        self.compiled = kernels.use_numba()
+        if self.compiled:
+            n, m = self.n, self.m
+            self.times_array = np.array(self.times, dtype=np.int64)
+            self.arrays = [np.zeros(m, dtype=np.int64), np.zeros(m, dtype=np.int64), np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64)]
+            self.checkpoint_arrays = [np.zeros((n, m), dtype=np.int64), np.zeros((n, m), dtype=np.int64), np.zeros((n, m), dtype=np.int64),
+                                      np.zeros((n, n), dtype=np.int64), np.zeros((n, n), dtype=np.int64)]
+            self.permutation = np.zeros(n*m, dtype=np.int64)
+            # the traced schedule, which neighbours are swapped into and back out of,
+            # and a buffer for everything else, so no call allocates a schedule array
+            self.working = np.zeros((m, n), dtype=np.int64)
+            self.buffer = np.zeros((m, n), dtype=np.int64)
+            self.scratch = [np.zeros(m, dtype=np.int64), np.zeros(m, dtype=np.int64), np.zeros(m, dtype=np.int64),
+                            np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64)]
+
+    def makespan(self, schedule):
+        if self.compiled:
+            self.buffer[:] = schedule
+            return self._compiled(self.buffer, False)
+        self._reset()
+        permutation = []
+        self._decode(schedule, 0, list(range(self.m)), permutation, None)
+        return (max(self.machine_available), permutation)
+
+    def trace(self, schedule):
+        """Decode `schedule` and keep the state at the start of every column
+        so that neighbours of it can be re-evaluated with `makespan_from`."""
+        if self.compiled:
+            self.working[:] = schedule
+            return self._compiled(self.working, True)
+        self._reset()
+        permutation = []
+        self.checkpoints = []
+        self._decode(schedule, 0, list(range(self.m)), permutation, self.checkpoints)
+        return (max(self.machine_available), permutation)
+
+    def makespan_from(self, schedule, column, move=None):
+        """Makespan of a schedule that matches the traced one before `column`.
+
+        Only columns `column..n-1` are decoded; the permutation is not built.
+        When `move` is the `(machine, a, b)` swap that turns the traced
+        schedule into `schedule`, the compiled path applies it to its own copy
+        of the traced schedule instead of converting `schedule`.
+        """
+        if self.compiled:
+            if move is None:
+                self.buffer[:, column:] = [row[column:] for row in schedule]
+                return int(kernels.decode_suffix(self.buffer, self.times_array, column, -1, 0, 0, *self.scratch,
+                                                 self.permutation, *self.checkpoint_arrays))
+            machine, a, b = move
+            return int(kernels.decode_suffix(self.working, self.times_array, column, machine, a, b, *self.scratch,
+                                             self.permutation, *self.checkpoint_arrays))
+        order, machine_available, machine_remaining, job_available, job_remaining = self.checkpoints[column]
+        self.machine_available[:] = machine_available
+        self.machine_remaining[:] = machine_remaining
+        self.job_available[:] = job_available
+        self.job_remaining[:] = job_remaining
+        self._decode(schedule, column, list(order), None, None)
+        return max(self.machine_available)
+
+    def critical_path(self, schedule):
+        """Critical operations of the decoded `schedule` as `(machine, column)`
+        pairs in processing order, from time zero to the makespan."""
+        n = self.n
+        times = self.times
+        _, permutation = self.makespan(schedule)
+        machine_available = [0]*self.m
+        job_available = [0]*n
+        machine_last = [None]*self.m
+        job_last = [None]*n
+        columns = [0]*self.m
+        previous = {}
+        last, makespan = None, -1
+        for operation in permutation:
+            job, i = divmod(operation, n)
+            operation = (i, columns[i])
+            columns[i] += 1
+            start = max(machine_available[i], job_available[job])
+            # follow the machine arc on ties so machine blocks stay together
+            if machine_last[i] is not None and machine_available[i] == start:
+                previous[operation] = machine_last[i]
+            elif job_last[job] is not None and job_available[job] == start:
+                previous[operation] = job_last[job]
+            else:
+                previous[operation] = None
+            end = start + times[i][job]
+            machine_available[i] = job_available[job] = end
+            machine_last[i] = job_last[job] = operation
+            if end > makespan:
+                last, makespan = operation, end
+        path = []
+        while last is not None:
+            path.append(last)
+            last = previous[last]
+        path.reverse()
+        return path
+
+    def _compiled(self, schedule, record):
+        machine_available, machine_remaining, job_available, job_remaining = self.arrays
+        machine_available[:] = 0
+        machine_remaining[:] = self.machine_times
+        job_available[:] = 0
+        job_remaining[:] = self.job_times
+        value = kernels.decode_columns(schedule, self.times_array, 0, np.arange(self.m),
+                                       machine_available, machine_remaining, job_available, job_remaining,
+                                       self.permutation, record, *self.checkpoint_arrays)
+        return (int(value), self.permutation.tolist())
+
+    def _reset(self):
+        self.machine_available[:] = [0]*self.m
+        self.machine_remaining[:] = self.machine_times
+        self.job_available[:] = [0]*self.n
+        self.job_remaining[:] = self.job_times
+
+    def _decode(self, schedule, start, order, permutation, checkpoints):
+        n = self.n
+        times = self.times
+        machine_available = self.machine_available
+        machine_remaining = self.machine_remaining
+        job_available = self.job_available
+        job_remaining = self.job_remaining
+        for j in range(start, n):
+            if checkpoints is not None:
+                checkpoints.append((order[:], machine_available[:], machine_remaining[:], job_available[:], job_remaining[:]))
+            order = self._column_order(schedule, j, order)
+            for i in order:
+                job = schedule[i][j]
+                duration = times[i][job]
+                end = machine_available[i] if machine_available[i] > job_available[job] else job_available[job]
+                end += duration
+                machine_available[i] = end
+                job_available[job] = end
+                machine_remaining[i] -= duration
+                job_remaining[job] -= duration
+                if permutation is not None:
+                    permutation.append(job*n+i)
+            order.sort(key=machine_available.__getitem__)
+
+    def _column_order(self, schedule, j, order):
+        # Machines free at the earliest time go first, the one with the most
+        # remaining work leading; remaining ties are broken by the remaining
+        # work of the job each machine is about to process.
+        machine_available = self.machine_available
+        machine_remaining = self.machine_remaining
+        first = machine_available[order[0]]
+        k = 1
+        while k < self.m and machine_available[order[k]] == first:
+            k += 1
+        if k == 1:
+            return order
+        candidates = sorted(order[:k], key=machine_remaining.__getitem__, reverse=True)
+        top = machine_remaining[candidates[0]]
+        c = 1
+        while c < k and machine_remaining[candidates[c]] == top:
+            c += 1
+        del candidates[c:]
+        if c > 1:
+            times = self.times
+            job_remaining = self.job_remaining
+            candidates.sort(key=lambda i: job_remaining[schedule[i][j]] - times[i][schedule[i][j]], reverse=True)
+        return candidates + [i for i in order if i not in candidates]
@@ -0,0 +1,50 @@
+import hashlib
+from array import array
+from collections import OrderedDict
+from itertools import chain
+
+FITNESS_CACHE_SIZE = 1 << 16
+
+
+class FitnessCache():
+    """Bounded LRU cache of makespans keyed by a 128-bit digest of a solution.
+
+    Works for tabu/SA schedules (lists of machine rows) and GA chromosomes
+    (NumPy code rows) alike. A cache only holds values of a single instance.
+    """
+
+    def __init__(self, capacity=FITNESS_CACHE_SIZE):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(solution):
+        if hasattr(solution, 'tobytes'):
+            data = solution.tobytes()
+        else:
+            data = array('l', chain.from_iterable(solution)).tobytes()
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+def merge_stats(stats):
+    return {'hits': sum(s['hits'] for s in stats), 'misses': sum(s['misses'] for s in stats)}
@@ -1,17 +1,33 @@
 import random
-import json
 import time
 import numpy as np
-from copy import copy, deepcopy
-from stqdm import stqdm
 from itertools import permutations
 from itertools import takewhile
-from matplotlib import pyplot as plt
+from itertools import chain
 from utils import *
+from progress import progress
+from packed_instances import load_test_instances
+import kernels
+from multiprocessing import Pipe, Process
+from parallel import restart_seeds, resolve_workers, run_restarts, run_units, run_report, merge_reports
+from fitness_cache import FitnessCache
+from run_stats import RunStats
+from stopping import StoppingRule, LOWER_BOUND, PEER_LOWER_BOUND, HEURISTIC
+from bounds import lower_bound, solved_by_heuristic
+from tabu_search import scheduling
+from result_sink import ResultSink
 
 POPSIZE =  200
 CROSSOVER_RATE = 0.6
 MUTATION_RATE = 0.1
+RESTARTS = 100
+MIGRATION_INTERVAL = 20
+MIGRANTS = 2
+ROULETTE = 'roulette'
+TOURNAMENT = 'tournament'
+TOURNAMENT_SIZE = 2
+RING = 'ring'
+FULLY_CONNECTED = 'full'
 
 class Individual:
     def __init__(self, processing_times, n, m):
@@ -49,6 +65,8 @@ class Individual:
         return (False, -1)
 
     def calc_fitness(self, processing_times, n, m):
+        if kernels.use_numba():
+            return int(kernels.chromosome_fitness(np.array(self.code, dtype=np.int64), np.array(processing_times, dtype=np.int64)))
         jobs = [[] for _ in range(n)]
         machines = [[] for _ in range(m)]
         for operation in self.code:
@@ -104,6 +122,110 @@ class Individual:
     
 
 
+INFINITY = 1 << 60
+
+def population_fitness(codes, processing_times):
+    """Decode a whole population at once.
+
+    `codes` is a (pop_size, n*m) integer matrix of chromosomes. The operations
+    of all chromosomes are placed column by column with the same gap-insertion
+    rules as `Individual.calc_fitness`, keeping the machine and job intervals
+    of every chromosome in padded, sorted interval matrices.
+    Returns the vector of makespans.
+    """
+    codes = np.asarray(codes)
+    times = np.asarray(processing_times, dtype=np.int64)
+    if kernels.use_numba():
+        return kernels.population_fitness(np.ascontiguousarray(codes, dtype=np.int64), times)
+    n = len(times)
+    m = len(times[0])
+    size = len(codes)
+    rows = np.arange(size)
+    # row r*m+i holds the intervals of machine i of chromosome r, likewise for jobs
+    machine_starts = np.full((size*m, n), INFINITY, dtype=np.int64)
+    machine_ends = np.full((size*m, n), INFINITY, dtype=np.int64)
+    machine_count = np.zeros(size*m, dtype=np.int64)
+    job_starts = np.full((size*n, m), INFINITY, dtype=np.int64)
+    job_ends = np.full((size*n, m), INFINITY, dtype=np.int64)
+    job_count = np.zeros(size*n, dtype=np.int64)
+    fitness = np.zeros(size, dtype=np.int64)
+
+    for operation in codes.T:
+        machine = operation % n
+        job = operation // n
+        duration = times[job, machine]
+        machine_row = rows*m + machine
+        job_row = rows*n + job
+        ms = machine_starts[machine_row]
+        me = machine_ends[machine_row]
+        mc = machine_count[machine_row]
+        js = job_starts[job_row]
+        je = job_ends[job_row]
+        jc = job_count[job_row]
+
+        # the window offered by the machine: before its first interval, after
+        # it, or the gap between its last two intervals
+        last = np.maximum(mc-1, 0)
+        several = mc >= 2
+        single = mc == 1
+        ahead = single & (ms[:, 0] != 0)
+        start = np.where(several, me[rows, np.maximum(mc-2, 0)], np.where(single & ~ahead, me[:, 0], 0))
+        limit = np.where(several, ms[rows, last], np.where(ahead, ms[:, 0], INFINITY))
+        open_window = ~several | (limit - start >= duration)
+
+        # check_job on that window
+        fit = open_window & (jc == 0) & (start + duration <= limit)
+        place = start
+        one_job = open_window & (jc == 1)
+        before_job = one_job & (js[:, 0] != 0) & (js[:, 0] >= start + duration)
+        after_job = one_job & ~before_job & (je[:, 0] + duration <= limit)
+        fit |= before_job | after_job
+        place = np.where(after_job, np.maximum(je[:, 0], start), place)
+        active = open_window & (jc >= 2)
+        for j in range(m-1):
+            active &= (place + duration <= limit) & (j < jc-1)
+            if not active.any():
+                break
+            place = np.where(active & (js[:, j] <= place) & (place < je[:, j]), je[:, j], place)
+            found = active & (place >= je[:, j]) & (place + duration <= js[:, j+1])
+            fit |= found
+            active &= ~found
+
+        in_window = fit & (place + duration <= limit)
+        machine_last = np.where(mc > 0, me[rows, last], 0)
+        job_last = np.where(jc > 0, je[rows, np.maximum(jc-1, 0)], 0)
+        start = np.where(in_window, place, np.maximum(machine_last, job_last))
+        end = start + duration
+        np.maximum(fitness, end, out=fitness)
+
+        machine_starts[machine_row], machine_ends[machine_row] = _insert_sorted(ms, me, start, end)
+        machine_count[machine_row] += 1
+        job_starts[job_row], job_ends[job_row] = _insert_sorted(js, je, start, end)
+        job_count[job_row] += 1
+
+    return fitness
+
+
+def _insert_sorted(starts, ends, start, end):
+    # interval lists are kept sorted by (start, end) with INFINITY padding
+    start = start[:, None]
+    end = end[:, None]
+    position = ((starts < start) | ((starts == start) & (ends <= end))).sum(axis=1)[:, None]
+    columns = np.arange(starts.shape[1])
+    keep = columns < position
+    at = columns == position
+    new_starts = np.empty_like(starts)
+    new_starts[:, 1:] = starts[:, :-1]
+    np.copyto(new_starts, starts, where=keep)
+    np.copyto(new_starts, start, where=at)
+    new_ends = np.empty_like(ends)
+    new_ends[:, 1:] = ends[:, :-1]
+    np.copyto(new_ends, ends, where=keep)
+    np.copyto(new_ends, end, where=at)
+    return new_starts, new_ends
+
+
+
 # generational genetic algorithm
 # uniform crossover with rate 0.6,
 # swap mutation with rate 0.1
@@ -111,90 +233,288 @@ class Individual:
 # 500 generations with 200 chromosomes
 
 
-def selection(population):
-    population_fitness = sum([1/chromosome.fitness for chromosome in population])
-    
-    chromosome_probabilities = [(1/(chromosome.fitness)/population_fitness) for chromosome in population]
-    
-    parents = random.choices(population, weights=chromosome_probabilities, k=2)
-   
-    return (parents[0], parents[1])
+def selection(fitness, pairs, rng):
+    """Draw `pairs` parent index pairs in one call, built from a single
+    cumulative wheel per generation."""
+    cumulative = np.cumsum(1/fitness)
+    draws = np.searchsorted(cumulative, rng.random(2*pairs)*cumulative[-1], side='right')
+    # guards the float edge where a draw lands exactly on the wheel's end
+    return np.minimum(draws, len(fitness)-1).reshape(pairs, 2)
+
+def tournament_selection(fitness, pairs, rng, size=TOURNAMENT_SIZE):
+    """The fittest of `size` uniformly drawn individuals wins each parent slot."""
+    candidates = rng.integers(0, len(fitness), (2*pairs, size))
+    winners = candidates[np.arange(2*pairs), np.argmin(fitness[candidates], axis=1)]
+    return winners.reshape(pairs, 2)
+
+SELECTIONS = {ROULETTE: selection, TOURNAMENT: tournament_selection}
 
 def crossover (parent1, parent2, child1, child2):
-    code1 = [-1]*len(child1.code)
-    code2 = [-1]*len(child1.code)
-    p1 = parent1.code.copy()
-    p2 = parent2.code.copy()
-    for i in range(len(parent1.code)):
-        if random.random()<0.5:
-            code1[i]=parent1.code[i]
-            p2.remove(parent1.code[i])
-            code2[i]=parent2.code[i]
-            p1.remove(parent2.code[i])
-    j=0
-    for i in range(len(code1)):
-        if code1[i]==-1:
-            code1[i]=p2[j]
-            code2[i]=p1[j]
-            j+=1
-
-    child1.code = code1.copy()
-    child2.code = code2.copy()
+    mask = np.fromiter((random.random()<0.5 for _ in range(len(parent1))), dtype=bool, count=len(parent1))
+    _keep_and_fill(parent1, parent2, mask, child1)
+    _keep_and_fill(parent2, parent1, mask, child2)
+
+def _keep_and_fill(keep_parent, fill_parent, mask, child):
+    # genes under the mask come from keep_parent, the gaps are filled with the
+    # remaining genes in the order they appear in fill_parent
+    used = np.zeros(len(keep_parent), dtype=bool)
+    used[keep_parent[mask]] = True
+    child[mask] = keep_parent[mask]
+    child[~mask] = fill_parent[~used[fill_parent]]
+
+def batch_crossover(parents1, parents2, rng):
+    """Uniform crossover of every row pair of `parents1` and `parents2` in one
+    vectorised call; returns the two child matrices."""
+    mask = rng.random(parents1.shape) < 0.5
+    rows = np.arange(len(parents1))[:, None]
+    children1 = np.where(mask, parents1, 0)
+    children2 = np.where(mask, parents2, 0)
+    used = np.zeros(parents1.shape, dtype=bool)
+    used[rows, parents1] = mask
+    # every row has as many gaps as unused genes, so the row-major
+    # boolean selections line up row by row
+    children1[~mask] = parents2[~used[rows, parents2]]
+    used[rows, parents2] = mask
+    children2[~mask] = parents1[~used[rows, parents1]]
+    return children1, children2
     
 def mutation (child, rate):
-    i = random.randrange(0,len(child.code))
+    i = random.randrange(0,len(child))
     j=i
     while j==i:
-        j = random.randrange(0,len(child.code))
-    child.code[i], child.code[j] = child.code[j], child.code[i]
+        j = random.randrange(0,len(child))
+    child[i], child[j] = child[j], child[i]
+
+def random_population(pop_size, n, m):
+    population = np.empty((pop_size, n*m), dtype=np.int64)
+    for i in range(pop_size):
+        population[i] = random.sample(range(n*m), n*m)
+    return population
 
-def ga_permutation(pop_size, num_iters, crossover_rate, mutation_rate, elitism_size, n, m, processing_times):
+def ga_permutation(pop_size, num_iters, crossover_rate, mutation_rate, elitism_size, n, m, processing_times, cache=None, stopping=None, migration=None, selection_method=ROULETTE, stats=None):
+    select = SELECTIONS[selection_method]
     
     if (pop_size - elitism_size) % 2 == 1:
         elitism_size += 1
     
-    population = [Individual(processing_times, n, m) for _ in range(pop_size)]
-    new_population =[ Individual(processing_times, n, m) for _ in range(pop_size)]
+    def evaluate(codes):
+        if cache is None:
+            if stats is not None:
+                stats.count('decodes', len(codes))
+            return population_fitness(codes, processing_times)
+        keys = [cache.key(code) for code in codes]
+        values = [cache.get(key) for key in keys]
+        missing = [i for i, value in enumerate(values) if value is None]
+        if stats is not None:
+            stats.count('decodes', len(missing))
+            stats.count('cache_hits', len(codes) - len(missing))
+        if missing:
+            for i, value in zip(missing, population_fitness(codes[missing], processing_times)):
+                values[i] = int(value)
+                cache.put(keys[i], values[i])
+        return np.array(values, dtype=np.int64)
     
-    for _ in range(num_iters):
+    rng = np.random.default_rng(random.getrandbits(64))
+    # two preallocated buffers: each generation is written into the back
+    # buffer and the buffers are swapped afterwards
+    population = random_population(pop_size, n, m)
+    fitness = evaluate(population)
+    new_population = np.empty_like(population)
+    new_fitness = np.empty_like(fitness)
+    if stats is not None:
+        best_value = int(fitness.min())
+        stats.best(0, best_value)
+    
+    for it in range(num_iters):
+        if stopping is not None and stopping.update(it, int(fitness.min())):
+            break
+        if stats is not None:
+            stats.count('generations')
+            lap = time.perf_counter()
             
-        population.sort(key=lambda x: x.fitness)  
-        new_population[:elitism_size] = population[:elitism_size]
+        elites = np.argsort(fitness, kind='stable')[:elitism_size]
+        new_population[:elitism_size] = population[elites]
+        new_fitness[:elitism_size] = fitness[elites]
+        if stats is not None:
+            lap = stats.lap('copy', lap)
         
-        for i in range(elitism_size, pop_size, 2):
-            parent1, parent2 = selection(population)
-            
-            if random.random() < crossover_rate:
-                crossover(parent1, parent2,
-                      new_population[i],
-                      new_population[i+1])
-            
+        pairs = select(fitness, (pop_size - elitism_size)//2, rng)
+        if stats is not None:
+            lap = stats.lap('selection', lap)
+        parents1 = population[pairs[:, 0]]
+        parents2 = population[pairs[:, 1]]
+        if stats is not None:
+            lap = stats.lap('copy', lap)
+        children1, children2 = batch_crossover(parents1, parents2, rng)
+        crossed = (rng.random(len(pairs)) < crossover_rate)[:, None]
+        new_population[elitism_size::2] = np.where(crossed, children1, parents1)
+        new_population[elitism_size+1::2] = np.where(crossed, children2, parents2)
+        if stats is not None:
+            stats.count('crossovers', int(crossed.sum()))
+            lap = stats.lap('crossover', lap)
+        
+        for i in range(elitism_size, pop_size):
             mutation(new_population[i], mutation_rate)
-            mutation(new_population[i+1], mutation_rate)
-            
-            new_population[i].fitness = new_population[i].calc_fitness(processing_times, n, m)
-            new_population[i+1].fitness = new_population[i+1].calc_fitness(processing_times, n, m)
+        if stats is not None:
+            lap = stats.lap('mutation', lap)
+        
+        new_fitness[elitism_size:] = evaluate(new_population[elitism_size:])
+        if stats is not None:
+            lap = stats.lap('decode', lap)
         
-        population = deepcopy(new_population)
+        population, new_population = new_population, population
+        fitness, new_fitness = new_fitness, fitness
+        
+        # island runs exchange codes with their neighbours after a generation
+        if migration is not None and migration(it, population, fitness):
+            break
+        if stats is not None:
+            if migration is not None:
+                stats.lap('migration', lap)
+            if fitness.min() < best_value:
+                best_value = int(fitness.min())
+                stats.best(it+1, best_value)
             
-    best_individual = min(population, key=lambda x: x.fitness)
-    return best_individual.code, best_individual.fitness
+    best = int(np.argmin(fitness))
+    return population[best].tolist(), int(fitness[best])
+
+
+def ga_permutation_restart(pop_size, num_iters, crossover_rate, mutation_rate, elitism_size, n, m, processing_times, options):
+    # one cache and stopping rule per restart, returned with the result
+    cache = FitnessCache(options['cache_size']) if options['cache_size'] else None
+    stopping = StoppingRule(time_limit=options['time_limit'], lower_bound=options['lower_bound'], patience=options['patience'])
+    stats = RunStats() if options.get('stats') else None
+    result = ga_permutation(pop_size, num_iters, crossover_rate, mutation_rate, elitism_size, n, m, processing_times, cache=cache, stopping=stopping, selection_method=options['selection'], stats=stats)
+    return result, run_report(stopping, cache, stats)
+
+
+def island_targets(island, islands, topology):
+    if topology == RING:
+        return [(island+1) % islands] if islands > 1 else []
+    if topology == FULLY_CONNECTED:
+        return [k for k in range(islands) if k != island]
+    raise ValueError(f"unknown topology: {topology}")
+
+
+class Migration():
+    """Per-generation hook of an island's `ga_permutation`.
+
+    It records the best makespan of every generation and, every `interval`
+    generations, sends the island's `migrants` best codes to the coordinator
+    and puts the codes it receives in place of the worst individuals.
+    """
+
+    def __init__(self, conn, interval, migrants):
+        self.conn = conn
+        self.interval = interval
+        self.migrants = migrants
+        self.history = []
+        self.immigrants = 0
+        self.stop = None
+
+    def __call__(self, it, population, fitness):
+        self.history.append(int(fitness.min()))
+        if (it+1) % self.interval:
+            return False
+        order = np.argsort(fitness, kind='stable')
+        self.conn.send(('migrate', population[order[:self.migrants]].copy(), fitness[order[:self.migrants]].copy()))
+        message = self.conn.recv()
+        if isinstance(message, str):
+            # another island reached the lower bound
+            self.stop = message
+            return True
+        codes, values = message
+        count = min(len(codes), len(fitness)//2)
+        worst = order[len(order)-count:]
+        population[worst] = codes[:count]
+        fitness[worst] = values[:count]
+        self.immigrants += count
+        return False
+
+
+def _island(conn, seed, args, options, interval, migrants):
+    random.seed(seed)
+    cache = FitnessCache(options['cache_size']) if options['cache_size'] else None
+    stopping = StoppingRule(time_limit=options['time_limit'], lower_bound=options['lower_bound'], patience=options['patience'])
+    migration = Migration(conn, interval, migrants)
+    stats = RunStats() if options.get('stats') else None
+    result = ga_permutation(*args, cache=cache, stopping=stopping, migration=migration, selection_method=options['selection'], stats=stats)
+    report = run_report(stopping, cache, stats)
+    if migration.stop is not None:
+        # an island that reached the bound in the same generation keeps LOWER_BOUND
+        report['stop'] = LOWER_BOUND if result[1] <= options['lower_bound'] else migration.stop
+    report.update({'makespan': result[1], 'generations': len(migration.history), 'immigrants': migration.immigrants, 'history': migration.history})
+    conn.send(('done', result, report))
+    conn.close()
+
+
+def run_islands(args, options, islands, interval=MIGRATION_INTERVAL, migrants=MIGRANTS, topology=RING, seed=None):
+    """Evolve `islands` populations of `ga_permutation(*args)` in their own
+    processes and return each island's `(result, report)`.
+
+    The coordinator routes the migrants of every island to its neighbours in
+    `topology` in lock step, so a run is reproducible for a given seed. Once
+    an island reaches the lower bound the others are told to stop.
+    """
+    island_targets(0, islands, topology)  # fail early on an unknown topology
+    seeds = restart_seeds(seed, islands)
+    conns, processes = [], []
+    for k in range(islands):
+        conn, child = Pipe()
+        process = Process(target=_island, args=(child, seeds[k], args, options, interval, migrants))
+        process.start()
+        child.close()
+        conns.append(conn)
+        processes.append(process)
+    outcomes = [None]*islands
+    active = list(range(islands))
+    while active:
+        messages = {}
+        for k in active:
+            message = conns[k].recv()
+            if message[0] == 'done':
+                outcomes[k] = message[1:]
+            else:
+                messages[k] = message[1:]
+        active = list(messages)
+        stop = any(outcome is not None and outcome[1]['stop'] == LOWER_BOUND for outcome in outcomes)
+        for k in active:
+            if stop:
+                conns[k].send(PEER_LOWER_BOUND)
+                continue
+            # islands whose neighbours have finished get an empty batch
+            sources = [s for s in active if k in island_targets(s, islands, topology)] or [k]
+            codes = np.concatenate([messages[s][0] for s in sources])
+            values = np.concatenate([messages[s][1] for s in sources])
+            if sources == [k]:
+                codes, values = codes[:0], values[:0]
+            conns[k].send((codes, values))
+    for process in processes:
+        process.join()
+    return outcomes
+
 
 
 
 
-def run_genetic_algorithm(n,m,processing_times,ub=0,lb=0, num_iters=500,pop_size=POPSIZE,crossover_rate=CROSSOVER_RATE,mutation_rate=MUTATION_RATE):
+def run_genetic_algorithm(n,m,processing_times,ub=0,lb=0, num_iters=500,pop_size=POPSIZE,crossover_rate=CROSSOVER_RATE,mutation_rate=MUTATION_RATE,restarts=RESTARTS,workers=1,seed=None,cache_size=0,time_limit=None,patience=None,selection_method=ROULETTE,stats=False):
     elitism_size = int(0.2*pop_size)
     datas = []
     results = [[] for _ in range(10)]
+    lb = max(lb, lower_bound(processing_times))
     for i in range(1):
-        start_time = time.time()
-        j=0
-        for it in stqdm(range(100)):
-            results[i].append(ga_permutation(pop_size, num_iters, crossover_rate, mutation_rate, elitism_size, n, m, processing_times))
-            j+=1
-        end_time = time.time()
-        sequence,mspan = min(results[i])
+        start_time = time.perf_counter()
+        options = {'cache_size': cache_size, 'time_limit': time_limit, 'patience': patience, 'lower_bound': lb, 'selection': selection_method, 'stats': stats}
+        solved = solved_by_heuristic(scheduling(processing_times), processing_times, lb)
+        if solved is not None:
+            # the heuristic's operation order is already an optimal chromosome
+            outcomes = [((solved[1], solved[0]), {'stop': HEURISTIC})]
+        else:
+            outcomes = run_restarts(ga_permutation_restart, (pop_size, num_iters, crossover_rate, mutation_rate, elitism_size, n, m, processing_times, options), restarts,
+                                    workers=workers, seed=seed, progress=progress)
+        results[i] = [outcome[0] for outcome in outcomes]
+        end_time = time.perf_counter()
+        sequence,mspan = min(results[i], key=lambda result: result[1])
         datas.append({
             'n': int(n),  # Convert to int if n is a numpy int64
             'm': int(m),  # Convert to int if m is a numpy int64
@@ -205,28 +525,84 @@ def run_genetic_algorithm(n,m,processing_times,ub=0,lb=0, num_iters=500,pop_size
             'sequence': [int(seq) for seq in sequence],
             'runtime':end_time - start_time
         })
+        datas[-1].update(merge_reports([outcome[1] for outcome in outcomes]))
     
     return datas[0]
 
 
-def run_genetic_algorithm_tests(n,m,num_iters=500,pop_size=POPSIZE,mutation_rate=MUTATION_RATE,crossover_rate=CROSSOVER_RATE,save_location="results"):
+def run_island_genetic_algorithm(n,m,processing_times,ub=0,lb=0,num_iters=500,pop_size=POPSIZE,crossover_rate=CROSSOVER_RATE,mutation_rate=MUTATION_RATE,islands=None,migration_interval=MIGRATION_INTERVAL,migrants=MIGRANTS,topology=RING,seed=None,cache_size=0,time_limit=None,patience=None,selection_method=ROULETTE,stats=False):
+    elitism_size = int(0.2*pop_size)
+    islands = resolve_workers(islands)
+    lb = max(lb, lower_bound(processing_times))
+    start_time = time.perf_counter()
+    options = {'cache_size': cache_size, 'time_limit': time_limit, 'patience': patience, 'lower_bound': lb, 'selection': selection_method, 'stats': stats}
+    solved = solved_by_heuristic(scheduling(processing_times), processing_times, lb)
+    if solved is not None:
+        outcomes = [((solved[1], solved[0]), {'stop': HEURISTIC, 'makespan': solved[0], 'generations': 0, 'immigrants': 0, 'history': []})]
+    else:
+        outcomes = run_islands((pop_size, num_iters, crossover_rate, mutation_rate, elitism_size, n, m, processing_times), options,
+                               islands, interval=migration_interval, migrants=migrants, topology=topology, seed=seed)
+    end_time = time.perf_counter()
+    sequence,mspan = min((outcome[0] for outcome in outcomes), key=lambda result: result[1])
+    data = {
+        'n': int(n),  # Convert to int if n is a numpy int64
+        'm': int(m),  # Convert to int if m is a numpy int64
+        'upperbound': int(ub),  # Convert to int if ub is a numpy int64
+        'lowerbound': int(lb),  # Convert to int if lb is a numpy int64
+        'processing_times': [[int(time) for time in times] for times in processing_times],  # Convert each time if they are numpy int64
+        'makespan': int(mspan),  # Convert to int if mspan is a numpy int64
+        'sequence': [int(seq) for seq in sequence],
+        'runtime':end_time - start_time
+    }
+    data.update(merge_reports([outcome[1] for outcome in outcomes]))
+    # per-island convergence: final makespan, generations run, codes received
+    # and the best makespan after every generation
+    data['islands'] = [{key: outcome[1][key] for key in ('makespan', 'generations', 'immigrants', 'stop', 'history')} for outcome in outcomes]
+    return data
+
+
+
+def run_genetic_algorithm_tests(n,m,num_iters=500,pop_size=POPSIZE,mutation_rate=MUTATION_RATE,crossover_rate=CROSSOVER_RATE,restarts=RESTARTS,workers=1,seed=None,cache_size=0,time_limit=None,patience=None,selection_method=ROULETTE,save_location="results",resume=False,stats=False):
     elitism_size = int(0.2*pop_size)
     
-    datas = []
     test_name=f"test{n}{m}"
-    bounds = [(0,0) for _ in range(10)]
-    results = [[] for _ in range(10)]
-    for i in range(10):
-        instance_file = f"tests/{test_name}{str(i)}"
-        n, m, processing_times, ub, lb = read_instance(instance_file)
-        start_time = time.time()
-        j=0
-        for it in stqdm(range(100),desc=f"Genetic: J{n}M{m} Population:{pop_size} Mutation rate:{mutation_rate} "):
-            results[i].append(ga_permutation(pop_size, num_iters, crossover_rate, mutation_rate, elitism_size, n, m, processing_times))
-            j+=1
-        end_time = time.time()
-        sequence,mspan = min(results[i])
-        datas.append({
+    sink = ResultSink(f"{save_location}/genetic_"+test_name+'.jsonl', resume=resume)
+    completed = sink.completed()
+    instances = load_test_instances(n, m)
+    # every (instance, restart) pair is an independent work unit, so a pool
+    # keeps all workers busy across instance boundaries
+    seeds = restart_seeds(seed, 10*restarts)
+    units = []
+    solved = {}
+    for i, (n, m, processing_times, ub, lb) in enumerate(instances):
+        if i in completed:
+            continue
+        start_time = time.process_time()
+        solution = solved_by_heuristic(scheduling(processing_times), processing_times, lb)
+        if solution is not None:
+            solved[i] = (solution, time.process_time() - start_time)
+            continue
+        for j in range(restarts):
+            options = {'cache_size': cache_size, 'time_limit': time_limit, 'patience': patience, 'lower_bound': lb, 'selection': selection_method, 'stats': stats}
+            units.append(((i, j), seeds[i*restarts+j], (pop_size, num_iters, crossover_rate, mutation_rate, elitism_size, n, m, processing_times, options)))
+    results = [[None]*restarts for _ in range(10)]
+    reports = [[] for _ in range(10)]
+    runtimes = [0.0]*10
+    # instances the heuristic already solves are written as one finished run
+    finished = [((i, 0), ((sequence, mspan), {'stop': HEURISTIC}), cpu_time) for i, ((mspan, sequence), cpu_time) in solved.items()]
+    finished = chain(finished, run_units(ga_permutation_restart, units, workers=workers))
+    for (i, j), (result, report), cpu_time in progress(finished, total=len(solved)+len(units), desc=f"Genetic: J{n}M{m} Population:{pop_size} Mutation rate:{mutation_rate} "):
+        results[i][j] = result
+        reports[i].append(report)
+        runtimes[i] += cpu_time
+        if i in solved:
+            results[i] = results[i][:1]
+        elif len(reports[i]) < restarts:
+            continue
+        # the last restart of instance i is in, so its record can be written
+        n, m, processing_times, ub, lb = instances[i]
+        sequence,mspan = min(results[i], key=lambda result: result[1])
+        data = {
             'n': int(n),  # Convert to int if n is a numpy int64
             'm': int(m),  # Convert to int if m is a numpy int64
             'upperbound': int(ub),  # Convert to int if ub is a numpy int64
@@ -234,15 +610,12 @@ def run_genetic_algorithm_tests(n,m,num_iters=500,pop_size=POPSIZE,mutation_rate
             'processing_times': [[int(time) for time in times] for times in processing_times],  # Convert each time if they are numpy int64
             'makespan': int(mspan),  # Convert to int if mspan is a numpy int64
             'sequence': [int(seq) for seq in sequence],
-            'runtime':end_time-start_time,
-        })
-    best = [min([results[i][j][1] for j in range(len(results[i]))]) for i in range(10)]
-    mean = [int(sum([results[i][j][1] for j in range(len(results[i]))])/(len(results[i]))) for i in range(10)]
-    for i in range(10):
-        datas[i]['makespan']=int(best[i])
-        datas[i]['mean']=int(mean[i])
-    with open(f"{save_location}/genetic_"+test_name+'.json', 'w') as f:
-        json.dump(datas, f)
+            'runtime':runtimes[i],  # CPU time summed over the restarts
+            'mean': int(sum([result[1] for result in results[i]])/len(results[i]))
+        }
+        data.update(merge_reports(reports[i]))
+        sink.write(i, data)
+    sink.dump(f"{save_location}/genetic_"+test_name+'.json')
 
 
 
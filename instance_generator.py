@@ -1,45 +1,52 @@
+import argparse
+import random
 import numpy as np
+from packed_instances import write_instances
+from bounds import lower_bound
 
-def generator(seed, num_instances):
-    a = 16807
-    b = 127773
-    c = 2836
-    m = pow(2,31)-1
-    values = np.zeros(num_instances)
+A = 16807
+M = pow(2,31)-1
+
+
+def lcg_states(seed, count):
+    """The first `count` states after `seed` of Taillard's LCG,
+    seed <- 16807*seed mod (2^31-1), computed without a Python loop.
 
-    for i in range(num_instances):
-        k = seed//b
-        seed = a*(seed%b) - k*c
-        if seed<0:
-            seed += m
-        values[i] = seed/m
+    State k is seed*A^k mod M; the powers A^k are built by doubling blocks,
+    and every product stays below 2^62 so int64 arithmetic is exact.
+    """
+    powers = np.empty(count, dtype=np.int64)
+    if count == 0:
+        return powers
+    powers[0] = A
+    size = 1
+    while size < count:
+        step = min(size, count-size)
+        # A^(size+k) = A^k * A^size
+        powers[size:size+step] = powers[:step] * powers[size-1] % M
+        size += step
+    return seed % M * powers % M
 
-    return values
+
+def generator(seed, num_instances):
+    return lcg_states(seed, num_instances) / M
 
 def operation_times_generator(time_seed, n, m):
     values = generator(time_seed, n*m)
-    values =  [int(1+value*99) for value in values]
-    times = [[0 for _ in range(m)] for _ in range(n)]
-    i=0
-    j=0
-    for k in range(n*m):
-        i = k//m
-        j= k%m
-        times[i][j] = values[k]
-
-    return times
+    return (1+values*99).astype(np.int64).reshape(n, m)
 
 
   
 def machine_operations_generator(machine_seed, n, m):
-    machines = [[i for i in range(m)] for _ in range(n)]
-    values = generator(machine_seed, n*m)
-    v=0
-    for i in range(n):
-        for j in range(m):
-            k = int(j+(m-j)*values[v])
-            v+=1
-            machines[i][j], machines[i][k] = machines[i][k], machines[i][j]
+    machines = np.tile(np.arange(m), (n, 1))
+    values = generator(machine_seed, n*m).reshape(n, m)
+    rows = np.arange(n)
+    # the row-wise swaps of Taillard's shuffle, applied to all rows at once
+    for j in range(m):
+        k = (j+(m-j)*values[:, j]).astype(np.int64)
+        swapped = machines[rows, j]
+        machines[rows, j] = machines[rows, k]
+        machines[rows, k] = swapped
 
     return machines
 
@@ -61,20 +68,37 @@ def create_file(output_file, n, m, processing_times, ub, lb):
 def get_processing_times(n, m, time_seed, machine_seed):
     machine_operations = machine_operations_generator(machine_seed, n, m)
     operation_times = operation_times_generator(time_seed, n, m)
-    processing_times = [[0]*m for _ in range(n)]
-    for i in range(n):
-        machines = machine_operations[i]
-        for j in range(m):
-            processing_times[i][j] = operation_times[i][machines.index(j)]
+    # operation p of job i runs on machine machine_operations[i][p], so
+    # scattering through the permutation inverts it in one step
+    processing_times = np.empty((n, m), dtype=np.int64)
+    processing_times[np.arange(n)[:, None], machine_operations] = operation_times
         
     return processing_times
 
-def generate_instances(data, n, m):
 
-    for k in range(10):
-        instance = data[k]
-        output_file = "./tests/test{}{}{}".format(n,m,k)
-        create_file(output_file, n ,m ,get_processing_times(n,m,instance[0], instance[1]), instance[2], instance[3])
+def generate_suite(n, m, count, seed=None):
+    """`count` random instances as `(n, m, processing_times, ub, lb)`, with
+    time and machine seeds drawn from `seed`; the upper bound is not known (0)."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        time_seed, machine_seed = rng.randint(1, M-1), rng.randint(1, M-1)
+        processing_times = get_processing_times(n, m, time_seed, machine_seed)
+        yield n, m, processing_times, 0, lower_bound(processing_times)
+
+
+def write_suite(instances, location="./tests", prefix="test", packed=None):
+    """Write instances as text files `{location}/{prefix}{n}{m}{k}`, or all
+    into the packed file `packed` when it is given."""
+    if packed is not None:
+        write_instances(packed, instances)
+        return
+    for k, (n, m, processing_times, ub, lb) in enumerate(instances):
+        create_file(f"{location}/{prefix}{n}{m}{k}", n, m, processing_times, ub, lb)
+
+
+def generate_instances(data, n, m, location="./tests", packed=None):
+    write_suite(((n, m, get_processing_times(n, m, instance[0], instance[1]), instance[2], instance[3]) for instance in data),
+                location=location, packed=packed)
 
 four = [
     [1166510396, 164000672, 193, 186],
@@ -127,7 +151,28 @@ fifteen = [ [1561423441,1787167667, 956, 937],
 [1678386613, 1567160817, 935, 902]
 ]
 
-generate_instances(four,n=4,m=4)
-generate_instances(five,n=5,m=5)
-generate_instances(seven,n=7,m=7)
-generate_instances(fifteen,n=15,m=15)
\ No newline at end of file
+
+BENCHMARKS = [(four, 4), (five, 5), (seven, 7), (fifteen, 15)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate Taillard open-shop instances.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    benchmarks = commands.add_parser("benchmarks", help="regenerate the 4x4 to 15x15 benchmark instances")
+    benchmarks.add_argument("--location", default="./tests")
+    benchmarks.add_argument("--packed", action="store_true", help="write tests/test{n}{m}.ossp instead of text files")
+    suite = commands.add_parser("suite", help="generate random instances")
+    suite.add_argument("-n", type=int, required=True, help="jobs")
+    suite.add_argument("-m", type=int, required=True, help="machines")
+    suite.add_argument("--count", type=int, default=10)
+    suite.add_argument("--seed", type=int, default=None)
+    suite.add_argument("--location", default="./tests")
+    suite.add_argument("--prefix", default="random")
+    suite.add_argument("--packed", default=None, help="packed output file instead of text files")
+    args = parser.parse_args()
+    if args.command == "benchmarks":
+        for data, size in BENCHMARKS:
+            packed = f"{args.location}/test{size}{size}.ossp" if args.packed else None
+            generate_instances(data, n=size, m=size, location=args.location, packed=packed)
+    else:
+        write_suite(generate_suite(args.n, args.m, args.count, args.seed), location=args.location, prefix=args.prefix, packed=args.packed)
@@ -0,0 +1,225 @@
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+PYTHON = 'python'
+NUMBA = 'numba'
+
+_backend = NUMBA if numba is not None else PYTHON
+
+
+def set_backend(backend):
+    global _backend
+    if backend not in (PYTHON, NUMBA):
+        raise ValueError(f"unknown backend: {backend}")
+    if backend == NUMBA and numba is None:
+        raise ImportError("the numba backend needs numba to be installed")
+    _backend = backend
+
+
+def get_backend():
+    return _backend
+
+
+def use_numba():
+    return _backend == NUMBA
+
+
+def _jit(func):
+    # without numba the kernels stay importable as (slow) plain Python
+    if numba is None:
+        return func
+    return numba.njit(cache=True)(func)
+
+
+INFINITY = 1 << 60
+
+
+@_jit
+def decode_columns(schedule, times, start, order, machine_available, machine_remaining, job_available, job_remaining,
+                   permutation, record, checkpoint_order, checkpoint_machine_available, checkpoint_machine_remaining,
+                   checkpoint_job_available, checkpoint_job_remaining):
+    """Compiled counterpart of `Decoder._decode` on int64 arrays; `schedule`
+    and `times` are (m, n) machine-major matrices. Returns the makespan."""
+    m, n = schedule.shape
+    candidates = np.empty(m, dtype=np.int64)
+    merged = np.empty(m, dtype=np.int64)
+    for j in range(start, n):
+        if record:
+            checkpoint_order[j] = order
+            checkpoint_machine_available[j] = machine_available
+            checkpoint_machine_remaining[j] = machine_remaining
+            checkpoint_job_available[j] = job_available
+            checkpoint_job_remaining[j] = job_remaining
+        first = machine_available[order[0]]
+        k = 1
+        while k < m and machine_available[order[k]] == first:
+            k += 1
+        if k > 1:
+            # stable insertion sorts, descending, as list.sort(reverse=True)
+            for a in range(k):
+                x = order[a]
+                b = a - 1
+                while b >= 0 and machine_remaining[candidates[b]] < machine_remaining[x]:
+                    candidates[b+1] = candidates[b]
+                    b -= 1
+                candidates[b+1] = x
+            c = 1
+            while c < k and machine_remaining[candidates[c]] == machine_remaining[candidates[0]]:
+                c += 1
+            if c > 1:
+                for a in range(1, c):
+                    x = candidates[a]
+                    key = job_remaining[schedule[x, j]] - times[x, schedule[x, j]]
+                    b = a - 1
+                    while b >= 0 and job_remaining[schedule[candidates[b], j]] - times[candidates[b], schedule[candidates[b], j]] < key:
+                        candidates[b+1] = candidates[b]
+                        b -= 1
+                    candidates[b+1] = x
+            p = 0
+            for a in range(c):
+                merged[p] = candidates[a]
+                p += 1
+            for a in range(m):
+                x = order[a]
+                chosen = False
+                for b in range(c):
+                    if candidates[b] == x:
+                        chosen = True
+                if not chosen:
+                    merged[p] = x
+                    p += 1
+            order[:] = merged
+        for a in range(m):
+            i = order[a]
+            job = schedule[i, j]
+            duration = times[i, job]
+            end = max(machine_available[i], job_available[job]) + duration
+            machine_available[i] = end
+            job_available[job] = end
+            machine_remaining[i] -= duration
+            job_remaining[job] -= duration
+            permutation[j*m+a] = job*n + i
+        for a in range(1, m):
+            x = order[a]
+            b = a - 1
+            while b >= 0 and machine_available[order[b]] > machine_available[x]:
+                order[b+1] = order[b]
+                b -= 1
+            order[b+1] = x
+    return machine_available.max()
+
+
+@_jit
+def decode_suffix(schedule, times, start, machine, a, b, order, machine_available, machine_remaining, job_available, job_remaining,
+                  permutation, checkpoint_order, checkpoint_machine_available, checkpoint_machine_remaining,
+                  checkpoint_job_available, checkpoint_job_remaining):
+    """Makespan of the traced `schedule` with operations `a` and `b` of
+    `machine` swapped (none when `machine` < 0), decoded from the checkpoint
+    of column `start` into the scratch arrays. The swap is undone on return."""
+    order[:] = checkpoint_order[start]
+    machine_available[:] = checkpoint_machine_available[start]
+    machine_remaining[:] = checkpoint_machine_remaining[start]
+    job_available[:] = checkpoint_job_available[start]
+    job_remaining[:] = checkpoint_job_remaining[start]
+    if machine >= 0:
+        schedule[machine, a], schedule[machine, b] = schedule[machine, b], schedule[machine, a]
+    value = decode_columns(schedule, times, start, order, machine_available, machine_remaining, job_available, job_remaining,
+                           permutation, False, checkpoint_order, checkpoint_machine_available, checkpoint_machine_remaining,
+                           checkpoint_job_available, checkpoint_job_remaining)
+    if machine >= 0:
+        schedule[machine, a], schedule[machine, b] = schedule[machine, b], schedule[machine, a]
+    return value
+
+
+@_jit
+def check_job(start, limit, duration, job_starts, job_ends, count):
+    """Compiled counterpart of `Individual.check_job`."""
+    if count == 0:
+        if start + duration <= limit:
+            return True, start
+    elif count == 1:
+        if job_starts[0] != 0 and job_starts[0] >= start + duration:
+            return True, start
+        if job_ends[0] + duration <= limit:
+            return True, max(job_ends[0], start)
+    else:
+        end = start + duration
+        j = 0
+        while end <= limit and j < count - 1:
+            if job_starts[j] <= start < job_ends[j]:
+                start = job_ends[j]
+                end = start + duration
+            if start >= job_ends[j] and end <= job_starts[j+1]:
+                return True, start
+            j += 1
+    return False, -1
+
+
+@_jit
+def _insert_interval(starts, ends, count, start, end):
+    position = count
+    while position > 0 and (starts[position-1] > start or (starts[position-1] == start and ends[position-1] > end)):
+        starts[position] = starts[position-1]
+        ends[position] = ends[position-1]
+        position -= 1
+    starts[position] = start
+    ends[position] = end
+
+
+@_jit
+def chromosome_fitness(code, times):
+    """Compiled counterpart of `Individual.calc_fitness`; `times` is the
+    (n, m) job-major processing-time matrix."""
+    n, m = times.shape
+    machine_starts = np.empty((m, n), dtype=np.int64)
+    machine_ends = np.empty((m, n), dtype=np.int64)
+    machine_count = np.zeros(m, dtype=np.int64)
+    job_starts = np.empty((n, m), dtype=np.int64)
+    job_ends = np.empty((n, m), dtype=np.int64)
+    job_count = np.zeros(n, dtype=np.int64)
+    fitness = 0
+    for operation in code:
+        machine = operation % n
+        job = operation // n
+        duration = times[job, machine]
+        count = machine_count[machine]
+        start = 0
+        limit = INFINITY
+        window = True
+        if count == 1 and machine_starts[machine, 0] != 0:
+            limit = machine_starts[machine, 0]
+        elif count == 1:
+            start = machine_ends[machine, 0]
+        elif count >= 2:
+            # only the gap between the last two intervals is ever used
+            start = machine_ends[machine, count-2]
+            limit = machine_starts[machine, count-1]
+            window = limit - start >= duration
+        fit = False
+        if window:
+            fit, start = check_job(start, limit, duration, job_starts[job], job_ends[job], job_count[job])
+        if not (fit and start + duration <= limit):
+            start = 0
+            if count >= 1:
+                start = machine_ends[machine, count-1]
+            if job_count[job] >= 1:
+                start = max(start, job_ends[job, job_count[job]-1])
+        end = start + duration
+        _insert_interval(machine_starts[machine], machine_ends[machine], count, start, end)
+        machine_count[machine] += 1
+        _insert_interval(job_starts[job], job_ends[job], job_count[job], start, end)
+        job_count[job] += 1
+        fitness = max(fitness, end)
+    return fitness
+
+
+@_jit
+def population_fitness(codes, times):
+    fitness = np.empty(len(codes), dtype=np.int64)
+    for r in range(len(codes)):
+        fitness[r] = chromosome_fitness(codes[r], times)
+    return fitness
@@ -21,6 +21,10 @@ from genetic import (
     run_genetic_algorithm,
     run_genetic_algorithm_tests
 )
+from progress import use_streamlit_progress
+
+# the solvers only report progress when a UI installs a progress bar
+use_streamlit_progress()
 
 
 
@@ -67,21 +71,21 @@ with tab1:
         if st.button("RUN THE ALGORITHM", use_container_width=True,type="primary",key='runbtn_1'):
             for selected_algorithm in selected_algorithms:
                 if selected_algorithm == TABU_SEARCH:
-                    datas = run_tabu_search(n,m,processing_times,tabu_length=tabu_length, iterations=tabu_iterations)
+                    datas = run_tabu_search(n,m,processing_times,ub=up,lb=lb,tabu_length=tabu_length, iterations=tabu_iterations)
                     fig = visualize_schedule(algorithm_name=TABU_SEARCH,test_number=-1,n=n,m=m,processing_times=datas['processing_times'],sequence=datas['sequence'])
                     st.pyplot(fig=fig)
                     st.write(f"Makespan:{datas['makespan']}")
                     st.write(f"Runtime:{datas['runtime']}")
 
                 elif selected_algorithm == SIMULATED_ANNEALING:
-                    datas = run_simulated_anneling(n,m,processing_times,ub=0,lb=0,iterations=sa_iterations)
+                    datas = run_simulated_anneling(n,m,processing_times,ub=up,lb=lb,iterations=sa_iterations)
                     fig = visualize_schedule(algorithm_name=SIMULATED_ANNEALING,test_number=-1,n=n,m=m,processing_times=datas['processing_times'],sequence=datas['sequence'])
                     st.pyplot(fig=fig)
                     st.write(f"Makespan:{datas['makespan']}")
                     st.write(f"Runtime:{datas['runtime']}")
 
                 elif selected_algorithm == GENETIC_ALGORITHM:
-                    datas = run_genetic_algorithm(n,m,processing_times,num_iters=ga_iterations,pop_size=pop_size,mutation_rate=mutation_rate)
+                    datas = run_genetic_algorithm(n,m,processing_times,ub=up,lb=lb,num_iters=ga_iterations,pop_size=pop_size,mutation_rate=mutation_rate)
                     fig = visualize_schedule(algorithm_name=GENETIC_ALGORITHM,test_number=-1,n=n,m=m,processing_times=datas['processing_times'],sequence=datas['sequence'])
                     st.pyplot(fig=fig)
                     st.write(f"Makespan:{datas['makespan']}")
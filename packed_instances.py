@@ -0,0 +1,67 @@
+import os
+import sys
+import numpy as np
+from utils import read_instance
+from bounds import lower_bound
+
+MAGIC = b'OSSPACK1'
+HEADER = 4  # n, m, ub, lb
+
+
+def write_instances(filename, instances, append=False):
+    """Pack `(n, m, processing_times, ub, lb)` instances into `filename`.
+
+    Every record is an int32 header `n m ub lb` followed by the n x m
+    processing-time matrix, row by row; records are simply concatenated, so
+    `append=True` adds instances to an existing file.
+    """
+    exists = append and os.path.exists(filename) and os.path.getsize(filename) > 0
+    with open(filename, 'ab' if exists else 'wb') as f:
+        if not exists:
+            f.write(MAGIC)
+        for n, m, processing_times, ub, lb in instances:
+            f.write(np.array([n, m, ub, lb], dtype=np.int32).tobytes())
+            f.write(np.asarray(processing_times, dtype=np.int32).reshape(n, m).tobytes())
+
+
+def read_instances(filename):
+    """Load every instance of a packed file as `(n, m, processing_times, ub, lb)`.
+
+    The processing times are read-only (n, m) views into one memory map of
+    the file, so nothing is copied until a solver reads them.
+    """
+    with open(filename, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{filename} is not a packed instance file")
+    if os.path.getsize(filename) == len(MAGIC):
+        return []
+    data = np.memmap(filename, dtype=np.int32, mode='r', offset=len(MAGIC))
+    instances = []
+    offset = 0
+    while offset < len(data):
+        n, m, ub, lb = (int(value) for value in data[offset:offset+HEADER])
+        offset += HEADER
+        if offset + n*m > len(data):
+            raise ValueError(f"{filename} is truncated")
+        processing_times = data[offset:offset+n*m].reshape(n, m)
+        instances.append((n, m, processing_times, ub, max(lb, lower_bound(processing_times))))
+        offset += n*m
+    return instances
+
+
+def convert_text_instances(filenames, output, append=False):
+    """Pack the text instance files `filenames` into `output`."""
+    write_instances(output, (read_instance(filename) for filename in filenames), append=append)
+
+
+def load_test_instances(n, m, count=10, location="tests"):
+    # a packed tests/test{n}{m}.ossp replaces the ten text files when present
+    packed = f"{location}/test{n}{m}.ossp"
+    if os.path.exists(packed):
+        return read_instances(packed)[:count]
+    return [read_instance(f"{location}/test{n}{m}{i}") for i in range(count)]
+
+
+if __name__ == "__main__":
+    # python packed_instances.py OUTPUT TEXT_FILE...
+    convert_text_instances(sys.argv[2:], sys.argv[1])
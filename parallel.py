@@ -0,0 +1,101 @@
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from fitness_cache import merge_stats
+from stopping import count_reasons
+from run_stats import merge_run_stats
+
+
+def restart_seeds(seed, restarts):
+    # the same base seed always yields the same per-restart seeds,
+    # whichever worker ends up running a restart
+    rng = random.Random(seed)
+    return [rng.getrandbits(32) for _ in range(restarts)]
+
+
+def seeded_call(func, seed, args):
+    random.seed(seed)
+    return func(*args)
+
+
+def resolve_workers(workers):
+    if workers is None or workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def run_restarts(func, args, restarts, workers=1, seed=None, progress=None):
+    """Run `func(*args)` `restarts` times, each after seeding `random` with
+    its own restart seed, and return the results in restart order.
+
+    With more than one worker the restarts are spread over a process pool;
+    `progress(iterable, total)` may wrap the loop in a progress bar.
+    """
+    if restarts <= 0:
+        return []
+    seeds = restart_seeds(seed, restarts)
+    workers = resolve_workers(workers)
+    if progress is None:
+        progress = lambda iterable, total: iterable
+    if workers == 1:
+        return [seeded_call(func, s, args) for s in progress(seeds, restarts)]
+    results = [None]*restarts
+    with ProcessPoolExecutor(max_workers=min(workers, restarts)) as pool:
+        futures = {pool.submit(seeded_call, func, s, args): i for i, s in enumerate(seeds)}
+        for future in progress(as_completed(futures), restarts):
+            results[futures[future]] = future.result()
+    return results
+
+
+def timed_call(func, seed, args):
+    random.seed(seed)
+    start = time.process_time()
+    result = func(*args)
+    return result, time.process_time() - start
+
+
+def run_units(func, units, workers=1):
+    """Run `func(*args)` for every `(key, seed, args)` work unit and yield
+    `(key, result, cpu_time)` as soon as each unit finishes.
+
+    `cpu_time` is the CPU time the unit spent in its own process, so summing
+    it gives comparable runtimes whatever the number of workers.
+    """
+    if not units:
+        # e.g. a resumed suite with every instance already written
+        return
+    workers = resolve_workers(workers)
+    if workers == 1:
+        for key, seed, args in units:
+            result, cpu_time = timed_call(func, seed, args)
+            yield key, result, cpu_time
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(units))) as pool:
+        futures = {pool.submit(timed_call, func, seed, args): key for key, seed, args in units}
+        for future in as_completed(futures):
+            result, cpu_time = future.result()
+            yield futures[future], result, cpu_time
+
+
+def run_report(stopping, cache=None, stats=None):
+    report = {'stop': stopping.reason}
+    if cache is not None:
+        report['cache'] = cache.stats()
+    if stats is not None:
+        report['stats'] = stats.export()
+    return report
+
+
+def merge_reports(reports):
+    """Fold the per-run reports of an instance into the fields stored next to
+    its result: how often each stopping rule fired, the cache counters and,
+    for instrumented runs, the summed counters/timers and every run's trace."""
+    merged = {'stop': count_reasons([report['stop'] for report in reports])}
+    caches = [report['cache'] for report in reports if 'cache' in report]
+    if caches:
+        merged['cache'] = merge_stats(caches)
+    stats = [report['stats'] for report in reports if 'stats' in report]
+    if stats:
+        merged['stats'] = merge_run_stats(stats)
+    return merged
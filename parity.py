@@ -0,0 +1,49 @@
+import random
+import kernels
+from decoder import Decoder
+from batch_runner import iter_instances
+from tabu_search import scheduling, pairwise_exchange_neighborhood, swap_move
+from genetic import Individual, population_fitness, random_population
+
+
+def backend_makespans(backend, processing_times, schedules, codes):
+    kernels.set_backend(backend)
+    decoder = Decoder(processing_times)
+    decoded = [decoder.makespan(schedule) for schedule in schedules]
+    decoder.trace(schedules[0])
+    partial = []
+    for move in pairwise_exchange_neighborhood(schedules[0]):
+        swap_move(schedules[0], move)
+        partial.append(decoder.makespan_from(schedules[0], min(move[1], move[2])))
+        partial.append(decoder.makespan_from(schedules[0], min(move[1], move[2]), move))
+        swap_move(schedules[0], move)
+    individual = Individual.__new__(Individual)
+    fitness = []
+    for code in codes:
+        individual.code = code.tolist()
+        fitness.append(individual.calc_fitness(processing_times, len(processing_times), len(processing_times[0])))
+    return decoded, partial, fitness, population_fitness(codes, processing_times).tolist()
+
+
+def check_parity(pattern="tests/*", samples=20, seed=0):
+    """Compare every kernel of the numba backend with the Python path on all
+    instances matching `pattern`, text or packed; raises AssertionError on
+    the first mismatch."""
+    random.seed(seed)
+    checked = 0
+    for instance_file, (n, m, processing_times, ub, lb) in iter_instances([pattern]):
+        schedules = [scheduling(processing_times)] + [[random.sample(range(n), n) for _ in range(m)] for _ in range(samples)]
+        codes = random_population(samples, n, m)
+        expected = backend_makespans(kernels.PYTHON, processing_times, schedules, codes)
+        compiled = backend_makespans(kernels.NUMBA, processing_times, schedules, codes)
+        assert expected == compiled, f"backends disagree on {instance_file}"
+        checked += 1
+    return checked
+
+
+if __name__ == "__main__":
+    backend = kernels.get_backend()
+    try:
+        print(f"numba and python backends agree on {check_parity()} instances")
+    finally:
+        kernels.set_backend(backend)
@@ -0,0 +1,20 @@
+_bar = None
+
+
+def use_progress_bar(bar):
+    """Wrap solver loops in `bar(iterable, total=..., desc=...)`, e.g. a tqdm;
+    None turns progress reporting off again."""
+    global _bar
+    _bar = bar
+
+
+def use_streamlit_progress():
+    # imported here so headless runs never load streamlit
+    from stqdm import stqdm
+    use_progress_bar(stqdm)
+
+
+def progress(iterable, total=None, desc=None):
+    if _bar is None:
+        return iterable
+    return _bar(iterable, total=total, desc=desc)
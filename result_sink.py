@@ -0,0 +1,48 @@
+import json
+import os
+
+
+class ResultSink():
+    """Append-only JSON-Lines file holding one record per solved instance.
+
+    Every record is flushed and fsynced as soon as it is written, so a crash
+    loses at most the instance that was running. With `resume=True` the
+    records already in the file are kept (minus a last record cut short by a
+    crash) and `completed()` tells which instances can be skipped; otherwise
+    the file starts out empty.
+    """
+
+    def __init__(self, filename, resume=False):
+        self.filename = filename
+        if not resume or not os.path.exists(filename):
+            open(filename, 'w').close()
+            return
+        with open(filename, 'rb+') as f:
+            # drop a last line cut short by a crash so appends start on a fresh line
+            data = f.read()
+            f.truncate(data.rfind(b"\n") + 1)
+
+    def records(self):
+        if not os.path.exists(self.filename):
+            return []
+        records = []
+        with open(self.filename, 'r') as f:
+            for line in f:
+                records.append(json.loads(line))
+        return records
+
+    def completed(self):
+        return {record['instance'] for record in self.records()}
+
+    def write(self, instance, record):
+        line = json.dumps(dict(record, instance=instance))
+        with open(self.filename, 'a') as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def dump(self, filename):
+        # the per-suite JSON array the result loaders and plots read
+        records = sorted(self.records(), key=lambda record: record['instance'])
+        with open(filename, 'w') as f:
+            json.dump(records, f)
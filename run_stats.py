@@ -0,0 +1,50 @@
+import time
+
+
+class RunStats():
+    """Opt-in instrumentation of one solver run.
+
+    Solvers take `stats=None` and only touch this object behind an
+    `if stats is not None` check, so a run without it pays nothing but that
+    check. It keeps event counters, cumulative per-phase timers and a
+    convergence trace of `[seconds, iteration, best makespan]` points.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.timers = {}
+        self.trace = []
+        self.start = time.perf_counter()
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def lap(self, name, since):
+        # charge the time since `since` to phase `name` and start the next lap
+        now = time.perf_counter()
+        self.timers[name] = self.timers.get(name, 0.0) + now - since
+        return now
+
+    def add(self, exported):
+        # fold in the counters and timers another process exported for this run
+        for name, value in exported['counters'].items():
+            self.count(name, value)
+        for name, value in exported['timers'].items():
+            self.timers[name] = self.timers.get(name, 0.0) + value
+
+    def best(self, iteration, value):
+        self.trace.append([time.perf_counter() - self.start, iteration, int(value)])
+
+    def export(self):
+        return {'counters': dict(self.counters), 'timers': dict(self.timers), 'trace': list(self.trace)}
+
+
+def merge_run_stats(stats):
+    """Sum the counters and timers of exported runs; the traces stay per run."""
+    counters, timers = {}, {}
+    for exported in stats:
+        for name, value in exported['counters'].items():
+            counters[name] = counters.get(name, 0) + value
+        for name, value in exported['timers'].items():
+            timers[name] = timers.get(name, 0.0) + value
+    return {'counters': counters, 'timers': timers, 'traces': [exported['trace'] for exported in stats]}
@@ -1,39 +1,25 @@
+import math
 import random
-import json
 import time
-import numpy as np
-from copy import copy, deepcopy
-from itertools import permutations, takewhile
+from copy import copy
+from itertools import permutations
 from utils import *
-from stqdm import stqdm
+from progress import progress
+from packed_instances import load_test_instances
+from result_sink import ResultSink
+from decoder import Decoder
+from parallel import run_restarts, run_report, merge_reports
+from fitness_cache import FitnessCache
+from run_stats import RunStats
+from stopping import StoppingRule, HEURISTIC
+from bounds import lower_bound, solved_by_heuristic
 
-def makespan(scheduling, processing_times):
-    n = len(scheduling[0])
-    m = len(scheduling)
-    permutation=[]
-
-    jobs = [Job(i, processing_times[i]) for i in range(n)]
-    machines = [Machine(j, processing_times) for j in range(m)]
+RESTARTS = 100
+INITIAL_ACCEPTANCE = 0.8
+TEMPERATURE_SAMPLES = 100
 
-    for j in range(n):
-        machine_candidates = list(takewhile(lambda m: m.time_available == machines[0].time_available, machines))
-        if len(machine_candidates)>1:
-            machine_candidates.sort(key = lambda m: m.remaining_time, reverse=True)
-            machine_candidates = list(takewhile(lambda m: m.remaining_time == machine_candidates[0].remaining_time, machine_candidates))
-            if len(machine_candidates)>1:
-                job_candidates = [-1 for _ in range(m)]
-                for machine in machine_candidates:
-                    job_candidates[machine.id] = scheduling[machine.id][j]
-                machine_candidates.sort(key = lambda m: jobs[job_candidates[m.id]].remaining_time - processing_times[job_candidates[m.id]][m.id], reverse=True)
-        candidates_ids= [machine.id for machine in machine_candidates]
-        machines = machine_candidates + [machine for machine in machines if machine.id not in candidates_ids]
-        for machine in machines:
-            permutation.append(jobs[scheduling[machine.id][j]].id*n+machine.id)
-            update(machine, jobs[scheduling[machine.id][j]], processing_times)
-            
-        machines.sort(key = lambda m: m.time_available)
-       
-    return (np.max([machine.time_available for machine in machines]), permutation)
+def makespan(scheduling, processing_times):
+    return Decoder(processing_times).makespan(scheduling)
 
 
 class Job():
@@ -116,54 +102,201 @@ def scheduling(processing_times):
 
 
 
-def swap_operations(schedule):
-    neighbor = deepcopy(schedule)
-    row = random.choice(range(len(schedule)))
+def random_swap(schedule):
+    row = random.randrange(len(schedule))
     col1, col2 = random.sample(range(len(schedule[0])),2)
+    return (row, col1, col2)
+
+def swap_operations(schedule, move):
+    # applies the move in place; a swap is its own inverse, so applying the
+    # same move again undoes it
+    row, col1, col2 = move
     schedule[row][col1], schedule[row][col2] = schedule[row][col2], schedule[row][col1]
-    
-    return schedule
 
-def simulated_annealing(n, m, processing_times, max_iters):
+class GeometricCooling():
+    """T <- alpha*T, with alpha chosen so that the temperature falls to
+    `final_ratio` of its initial value over the iteration budget."""
+
+    def __init__(self, final_ratio=1e-3):
+        self.final_ratio = final_ratio
+
+    def start(self, temperature, iterations):
+        self.alpha = self.final_ratio ** (1/max(iterations, 1))
+
+    def update(self, iteration, temperature, accepted, improved):
+        return temperature*self.alpha
+
+
+class AdaptiveCooling():
+    """Steers the acceptance ratio of each `window` of moves towards a target
+    that decays from `start_ratio` to `end_ratio`, cooling while too many
+    moves are accepted and warming up while too few are."""
+
+    def __init__(self, start_ratio=0.5, end_ratio=0.01, window=100, rate=0.1):
+        self.start_ratio = start_ratio
+        self.end_ratio = end_ratio
+        self.window = window
+        self.rate = rate
+
+    def start(self, temperature, iterations):
+        self.iterations = max(iterations, 1)
+        self.accepted = 0
+
+    def update(self, iteration, temperature, accepted, improved):
+        self.accepted += accepted
+        if iteration % self.window:
+            return temperature
+        target = self.start_ratio * (self.end_ratio/self.start_ratio) ** (iteration/self.iterations)
+        ratio = self.accepted/self.window
+        self.accepted = 0
+        return temperature*(1-self.rate) if ratio > target else temperature/(1-self.rate)
+
+
+class ReheatingCooling(GeometricCooling):
+    """Geometric cooling that reheats to `reheat` times the initial
+    temperature after `stall` iterations without a new best solution."""
+
+    def __init__(self, final_ratio=1e-3, reheat=0.5, stall=2000):
+        super().__init__(final_ratio)
+        self.reheat = reheat
+        self.stall = stall
+
+    def start(self, temperature, iterations):
+        super().start(temperature, iterations)
+        self.initial = temperature
+        self.since_improvement = 0
+
+    def update(self, iteration, temperature, accepted, improved):
+        self.since_improvement = 0 if improved else self.since_improvement+1
+        if self.since_improvement >= self.stall:
+            self.since_improvement = 0
+            return max(temperature, self.reheat*self.initial)
+        return temperature*self.alpha
+
+
+COOLING_SCHEDULES = {
+    'geometric': GeometricCooling,
+    'adaptive': AdaptiveCooling,
+    'reheating': ReheatingCooling,
+}
+
+
+def initial_temperature(schedule, value, evaluate, samples=TEMPERATURE_SAMPLES, acceptance=INITIAL_ACCEPTANCE):
+    # temperature at which the average worsening swap out of `schedule` is
+    # accepted with probability `acceptance`; every probe is undone again
+    deltas = []
+    for _ in range(samples):
+        move = random_swap(schedule)
+        swap_operations(schedule, move)
+        delta = evaluate(schedule) - value
+        swap_operations(schedule, move)
+        if delta > 0:
+            deltas.append(delta)
+    if not deltas:
+        return 1.0
+    return -(sum(deltas)/len(deltas)) / math.log(acceptance)
+
+
+def simulated_annealing(n, m, processing_times, max_iters, cache=None, stopping=None, cooling=None, temperature=None, stats=None):
+    decoder = Decoder(processing_times)
+
+    def evaluate(schedule):
+        if cache is None:
+            if stats is not None:
+                stats.count('decodes')
+            return decoder.makespan(schedule)[0]
+        key = cache.key(schedule)
+        value = cache.get(key)
+        if value is None:
+            if stats is not None:
+                stats.count('decodes')
+            value = decoder.makespan(schedule)[0]
+            cache.put(key, value)
+        elif stats is not None:
+            stats.count('cache_hits')
+        return value
+
     solution = scheduling(processing_times)
-    value = makespan(solution,processing_times)[0]
-    best_solution = deepcopy(solution)
+    value = evaluate(solution)
+    best_solution = [row[:] for row in solution]
     best_value = value
+    if stats is not None:
+        stats.best(0, best_value)
+        lap = time.perf_counter()
+    if temperature is None:
+        temperature = initial_temperature(solution, value, evaluate)
+        if stats is not None:
+            stats.lap('initial_temperature', lap)
+    if cooling is None:
+        cooling = GeometricCooling()
+    cooling.start(temperature, max_iters)
     
     for i in (range(1, max_iters)):
+        if stopping is not None and stopping.update(i, best_value):
+            break
+        if stats is not None:
+            stats.count('iterations')
+            lap = time.perf_counter()
 
-        new_solution = swap_operations(solution)
+        move = random_swap(solution)
+        swap_operations(solution, move)
+        if stats is not None:
+            lap = stats.lap('move', lap)
         
-        new_value = makespan(new_solution, processing_times)[0]
+        new_value = evaluate(solution)
+        if stats is not None:
+            lap = stats.lap('decode', lap)
         
-        if new_value < value:
+        # Metropolis acceptance
+        delta = new_value - value
+        accepted = delta <= 0 or (temperature > 0 and random.random() < math.exp(-delta/temperature))
+        improved = False
+        if accepted:
             value = new_value
-            solution = new_solution
             if new_value < best_value:
                 best_value = new_value
-                best_solution = deepcopy(new_solution)
+                best_solution = [row[:] for row in solution]
+                improved = True
+                if stats is not None:
+                    stats.lap('copy', lap)
+                    stats.best(i, best_value)
         else:
-            p = 1 / i**0.5 
-            q = random.random()
-            if q < p:
-                value = new_value
-                solution = new_solution
+            swap_operations(solution, move)
+        if stats is not None:
+            stats.count('accepted' if accepted else 'rejected')
+        temperature = cooling.update(i, temperature, accepted, improved)
                 
-    return makespan(best_solution, processing_times)
+    return decoder.makespan(best_solution)
+
+
+def simulated_annealing_restart(n, m, processing_times, max_iters, options):
+    # one cache and stopping rule per restart, returned with the result
+    cache = FitnessCache(options['cache_size']) if options['cache_size'] else None
+    stopping = StoppingRule(time_limit=options['time_limit'], lower_bound=options['lower_bound'], patience=options['patience'])
+    cooling = COOLING_SCHEDULES[options['cooling']]()
+    stats = RunStats() if options.get('stats') else None
+    result = simulated_annealing(n, m, processing_times, max_iters, cache=cache, stopping=stopping, cooling=cooling, stats=stats)
+    return result, run_report(stopping, cache, stats)
 
 
-def run_simulated_anneling(n,m,processing_times,ub=0,lb=0,iterations=100000):
+def run_simulated_anneling(n,m,processing_times,ub=0,lb=0,iterations=100000,restarts=RESTARTS,workers=1,seed=None,cache_size=0,time_limit=None,patience=None,cooling='geometric',stats=False):
     datas = []
     test_name=f"test{n}{m}"
     bounds = [(0,0) for _ in range(10)]
     results = [[] for _ in range(10)]
+    lb = max(lb, lower_bound(processing_times))
     for i in range(1):
-        start_time = time.time()
-        j=0
-        for it in stqdm(range(100)):
-            results[i].append(simulated_annealing(n, m, processing_times, iterations))
-            j+=1
-        end_time = time.time()
+        start_time = time.perf_counter()
+        options = {'cache_size': cache_size, 'time_limit': time_limit, 'patience': patience, 'lower_bound': lb, 'cooling': cooling, 'stats': stats}
+        solved = solved_by_heuristic(scheduling(processing_times), processing_times, lb)
+        if solved is not None:
+            # every restart would start from this optimal schedule
+            outcomes = [(solved, {'stop': HEURISTIC})]
+        else:
+            outcomes = run_restarts(simulated_annealing_restart, (n, m, processing_times, iterations, options), restarts,
+                                    workers=workers, seed=seed, progress=progress)
+        results[i] = [outcome[0] for outcome in outcomes]
+        end_time = time.perf_counter()
         mspan,sequence  = min(results[i])
         datas.append({
             'n': int(n),  # Convert to int if n is a numpy int64
@@ -175,26 +308,30 @@ def run_simulated_anneling(n,m,processing_times,ub=0,lb=0,iterations=100000):
             'sequence': [int(seq) for seq in sequence],
             'runtime':end_time - start_time
         })
+        datas[-1].update(merge_reports([outcome[1] for outcome in outcomes]))
     return datas[0]
 
 
-def run_simulated_anneling_tests(n,m,iterations=100000,save_location="results"):
-    datas = []
+def run_simulated_anneling_tests(n,m,iterations=100000,restarts=RESTARTS,workers=1,seed=None,cache_size=0,time_limit=None,patience=None,cooling='geometric',save_location="results",resume=False,stats=False):
     test_name=f"test{n}{m}"
-    bounds = [(0,0) for _ in range(10)]
-    results = [[] for _ in range(10)]
-    for i in range(10):
-        instance_file = f"tests/{test_name}{str(i)}"
-        n, m, processing_times, ub, lb = read_instance(instance_file)
-
-        start_time = time.time()
-        j=0
-        for it in stqdm(range(100),desc=f"Simulated Annealing: J{n}M{m} "):
-            results[i].append(simulated_annealing(n, m, processing_times, iterations))
-            j+=1
-        end_time = time.time()
-        mspan,sequence  = min(results[i])
-        datas.append({
+    sink = ResultSink(f"{save_location}/simulated_anneling_"+test_name+'.jsonl', resume=resume)
+    completed = sink.completed()
+    for i, (n, m, processing_times, ub, lb) in enumerate(load_test_instances(n, m)):
+        if i in completed:
+            continue
+        start_time = time.perf_counter()
+        options = {'cache_size': cache_size, 'time_limit': time_limit, 'patience': patience, 'lower_bound': lb, 'cooling': cooling, 'stats': stats}
+        solved = solved_by_heuristic(scheduling(processing_times), processing_times, lb)
+        if solved is not None:
+            outcomes = [(solved, {'stop': HEURISTIC})]
+        else:
+            outcomes = run_restarts(simulated_annealing_restart, (n, m, processing_times, iterations, options), restarts,
+                                    workers=workers, seed=None if seed is None else seed+i,
+                                    progress=lambda it, total: progress(it, total=total, desc=f"Simulated Annealing: J{n}M{m} "))
+        results = [outcome[0] for outcome in outcomes]
+        end_time = time.perf_counter()
+        mspan,sequence  = min(results)
+        data = {
             'n': int(n),  # Convert to int if n is a numpy int64
             'm': int(m),  # Convert to int if m is a numpy int64
             'upperbound': int(ub),  # Convert to int if ub is a numpy int64
@@ -202,15 +339,11 @@ def run_simulated_anneling_tests(n,m,iterations=100000,save_location="results"):
             'processing_times': [[int(time) for time in times] for times in processing_times],  # Convert each time if they are numpy int64
             'makespan': int(mspan),  # Convert to int if mspan is a numpy int64
             'sequence': [int(seq) for seq in sequence],
-            'runtime':end_time - start_time
-        })
+            'runtime':end_time - start_time,
+            'mean': int(sum([result[0] for result in results])/len(results))
+        }
+        data.update(merge_reports([outcome[1] for outcome in outcomes]))
+        sink.write(i, data)
 
-    best = [min([results[i][j][0] for j in range(len(results[i]))]) for i in range(10)]
-    mean = [int(sum([results[i][j][0] for j in range(len(results[i]))])/(len(results[i]))) for i in range(10)]
-    for i in range(10):
-        datas[i]['makespan']=int(best[i])
-        datas[i]['mean']=int(mean[i])
-    
-    with open(f"{save_location}/simulated_anneling_"+test_name+'.json', 'w') as f:
-        json.dump(datas, f)
+    sink.dump(f"{save_location}/simulated_anneling_"+test_name+'.json')
 
@@ -0,0 +1,50 @@
+import time
+
+ITERATIONS = 'iterations'
+LOWER_BOUND = 'lower_bound'
+TIME_LIMIT = 'time_limit'
+PATIENCE = 'patience'
+# the heuristic start already reached the lower bound, so no search was run
+HEURISTIC = 'heuristic'
+# an island told to stop because another island reached the lower bound
+PEER_LOWER_BOUND = 'peer_lower_bound'
+
+
+class StoppingRule():
+    """Early-stopping rules checked once per solver iteration.
+
+    A run stops when its best makespan reaches `lower_bound`, after
+    `time_limit` seconds of wall-clock time, or after `patience` iterations
+    without improvement. `reason` tells which rule fired; it stays
+    ITERATIONS when the solver used up its iteration count.
+    """
+
+    def __init__(self, time_limit=None, lower_bound=0, patience=None):
+        self.time_limit = time_limit
+        self.lower_bound = lower_bound
+        self.patience = patience
+        self.start = time.perf_counter()
+        self.best = None
+        self.last_improvement = 0
+        self.reason = ITERATIONS
+
+    def update(self, iteration, best):
+        if self.best is None or best < self.best:
+            self.best = best
+            self.last_improvement = iteration
+        if self.lower_bound and best <= self.lower_bound:
+            self.reason = LOWER_BOUND
+        elif self.time_limit is not None and time.perf_counter() - self.start >= self.time_limit:
+            self.reason = TIME_LIMIT
+        elif self.patience is not None and iteration - self.last_improvement >= self.patience:
+            self.reason = PATIENCE
+        else:
+            return False
+        return True
+
+
+def count_reasons(reasons):
+    counts = {}
+    for reason in reasons:
+        counts[reason] = counts.get(reason, 0) + 1
+    return counts
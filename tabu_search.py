@@ -1,15 +1,23 @@
 import random
 import time
-import numpy as np
-from stqdm import stqdm
-from itertools import takewhile
+import warnings
 from copy import copy
-from copy import deepcopy
-from matplotlib import pyplot as plt
-import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from utils import *
+from progress import progress
+from packed_instances import load_test_instances
+from result_sink import ResultSink
+from decoder import Decoder
+from fitness_cache import FitnessCache
+from run_stats import RunStats
+from stopping import StoppingRule, HEURISTIC
+from bounds import lower_bound, solved_by_heuristic
+from parallel import run_report, merge_reports, resolve_workers
 
 TABU_LENGTH = 6
+PAIRWISE = 'pairwise'
+CRITICAL = 'critical'
 
 class Job():
     def __init__(self, job_id, processing_times):
@@ -40,28 +48,7 @@ def update(machine, job, processing_times):
     job.time_available = end
 
 def makespan(scheduling, processing_times):
-    n = len(scheduling[0])
-    m = len(scheduling)
-    permutation=[]
-    jobs = [Job(i, processing_times[i]) for i in range(n)]
-    machines = [Machine(j, processing_times) for j in range(m)]
-    for j in range(n):
-        machine_candidates = list(takewhile(lambda m: m.time_available == machines[0].time_available, machines))
-        if len(machine_candidates)>1:
-            machine_candidates.sort(key = lambda m: m.remaining_time, reverse=True)
-            machine_candidates = list(takewhile(lambda m: m.remaining_time == machine_candidates[0].remaining_time, machine_candidates))
-            if len(machine_candidates)>1:
-                job_candidates = [-1 for _ in range(m)]
-                for machine in machine_candidates:
-                    job_candidates[machine.id] = scheduling[machine.id][j]
-                machine_candidates.sort(key = lambda m: jobs[job_candidates[m.id]].remaining_time - processing_times[job_candidates[m.id]][m.id], reverse=True)
-        candidates_ids= [machine.id for machine in machine_candidates]
-        machines = machine_candidates + [machine for machine in machines if machine.id not in candidates_ids]
-        for machine in machines:
-            permutation.append(jobs[scheduling[machine.id][j]].id*n+machine.id)
-            update(machine, jobs[scheduling[machine.id][j]], processing_times)
-        machines.sort(key = lambda m: m.time_available)
-    return (np.max([machine.time_available for machine in machines]), permutation)
+    return Decoder(processing_times).makespan(scheduling)
 
 
 
@@ -114,53 +101,322 @@ def scheduling(processing_times):
 
 
 
+class TabuList():
+    """Move-attribute tabu memory.
+
+    A taken swap forbids swapping the same pair of jobs on the same machine
+    until its expiry iteration. With `hash_solutions` the last `tabu_length`
+    solutions are also kept as Zobrist hashes and revisiting them is tabu.
+    """
+
+    def __init__(self, tabu_length, n, m, hash_solutions=False, seed=None):
+        self.tabu_length = tabu_length
+        self.expiry = {}
+        self.hash_solutions = hash_solutions
+        if hash_solutions:
+            rng = random.Random(seed)
+            # keys[machine][position][job]
+            self.keys = [[[rng.getrandbits(64) for _ in range(n)] for _ in range(n)] for _ in range(m)]
+            self.visited = set()
+            self.history = deque()
+
+    def attribute(self, schedule, move):
+        i, j, k = move
+        a, b = schedule[i][j], schedule[i][k]
+        return (i, a, b) if a < b else (i, b, a)
+
+    def is_tabu(self, attribute, it, solution_hash=None):
+        if self.expiry.get(attribute, -1) >= it:
+            return True
+        return solution_hash is not None and solution_hash in self.visited
+
+    def add(self, attribute, it):
+        self.expiry[attribute] = it + self.tabu_length
+
+    def active(self, it):
+        # entries still tabu at iteration `it`; expired ones are dropped
+        self.expiry = {attribute: expiry for attribute, expiry in self.expiry.items() if expiry >= it}
+        return self.expiry
+
+    def hash(self, schedule):
+        h = 0
+        for i, row in enumerate(schedule):
+            keys = self.keys[i]
+            for j, job in enumerate(row):
+                h ^= keys[j][job]
+        return h
+
+    def move_hash(self, solution_hash, schedule, move):
+        # hash of `schedule` with `move` applied, computed before applying it
+        i, j, k = move
+        a, b = schedule[i][j], schedule[i][k]
+        keys = self.keys[i]
+        return solution_hash ^ keys[j][a] ^ keys[k][b] ^ keys[j][b] ^ keys[k][a]
+
+    def visit(self, solution_hash):
+        self.visited.add(solution_hash)
+        self.history.append(solution_hash)
+        if len(self.history) > self.tabu_length:
+            self.visited.discard(self.history.popleft())
+
+
 def pairwise_exchange_neighborhood(schedule):
     n = len(schedule[0])
     m = len(schedule)
-    neighborhood = []
     for i in range(m):
         for j in range(n):
-            for k in range(i, n):
-                    if j == k:
-                        continue
-                    neighbor = deepcopy(schedule)
-                    neighbor[i][j], neighbor[i][k] = neighbor[i][k], neighbor[i][j]
-                    neighborhood.append(neighbor)
-    return neighborhood
-
-
-
-def tabu_search(n, m, processing_times, tabu_length, max_iterations, initial_solution, upper_bound):
+            for k in range(j+1, n):
+                    yield (i, j, k)
+
+
+def critical_neighborhood(path, n):
+    """Adjacent swaps around the critical path, after the N1/N5 neighbourhoods.
+
+    A machine block (consecutive critical operations on one machine) only has
+    its first and last pairs swapped. An operation reached over a job arc is
+    moved one position earlier or later on its machine to break the job block.
+    """
+    moves = []
+    b = 0
+    while b < len(path):
+        i, column = path[b]
+        e = b
+        while e+1 < len(path) and path[e+1] == (i, path[e][1]+1):
+            e += 1
+        first, last = column, path[e][1]
+        if last > first:
+            candidates = [(i, first, first+1), (i, last-1, last)]
+        else:
+            candidates = [(i, column-1, column), (i, column, column+1)]
+        for move in candidates:
+            if move[1] >= 0 and move[2] < n and move not in moves:
+                moves.append(move)
+        b = e+1
+    return moves
+
+
+def swap_move(schedule, move):
+    # a swap is its own inverse, so applying the same move again undoes it
+    i, j, k = move
+    schedule[i][j], schedule[i][k] = schedule[i][k], schedule[i][j]
+
+
+
+def evaluate_neighbor(decoder, neighbor, column, incremental=True, cache=None, stats=None, move=None):
+    if cache is not None:
+        key = cache.key(neighbor)
+        value = cache.get(key)
+        if value is not None:
+            if stats is not None:
+                stats.count('cache_hits')
+            return value
+    if stats is not None:
+        stats.count('decodes')
+    if incremental:
+        value = decoder.makespan_from(neighbor, column, move)
+    else:
+        value = decoder.makespan(neighbor)[0]
+    if cache is not None:
+        cache.put(key, value)
+    return value
+
+
+def scan_moves(decoder, schedule, moves, tabu_list, it, best_makespan, current_hash=None, incremental=True, cache=None, stats=None):
+    """Score `moves` on `schedule` and return `(first, best)`, each a
+    `(makespan, move, attribute, hash)` tuple; `best` is the first lowest
+    admissible move, or None when every move is tabu."""
+    if stats is not None:
+        lap = time.perf_counter()
+    if incremental:
+        decoder.trace(schedule)
+        if stats is not None:
+            stats.count('decodes')
+            lap = stats.lap('decode', lap)
+    first = best = None
+    for move in moves:
+        if stats is not None:
+            # the time since the last move went into generating this one
+            lap = stats.lap('neighborhood', lap)
+            stats.count('moves')
+        attribute = tabu_list.attribute(schedule, move)
+        neighbor_hash = tabu_list.move_hash(current_hash, schedule, move) if tabu_list.hash_solutions else None
+        if stats is not None:
+            lap = stats.lap('tabu', lap)
+        swap_move(schedule, move)
+        # columns before min(j, k) decode exactly as in the current solution
+        neighbor_makespan = evaluate_neighbor(decoder, schedule, min(move[1], move[2]), incremental, cache, stats, move)
+        swap_move(schedule, move)
+        if stats is not None:
+            lap = stats.lap('decode', lap)
+        if first is None:
+            first = (neighbor_makespan, move, attribute, neighbor_hash)
+        if best is None or neighbor_makespan < best[0]:
+            # aspiration: a tabu move is allowed if it improves on the best solution
+            if neighbor_makespan < best_makespan or not tabu_list.is_tabu(attribute, it, neighbor_hash):
+                best = (neighbor_makespan, move, attribute, neighbor_hash)
+            elif stats is not None:
+                stats.count('tabu_rejected')
+            if stats is not None:
+                lap = stats.lap('tabu', lap)
+    if stats is not None:
+        stats.lap('neighborhood', lap)
+    return first, best
+
+
+# state of a neighbourhood scoring worker, set once by its pool initializer
+_worker = {}
+
+
+def _init_scoring_worker(processing_times, chunks, tabu_list):
+    _worker['decoder'] = Decoder(processing_times)
+    _worker['chunks'] = chunks
+    _worker['tabu_list'] = tabu_list
+
+
+def _score_chunk(index, schedule, it, best_makespan, expiry, visited, current_hash, incremental, record_stats):
+    tabu_list = _worker['tabu_list']
+    tabu_list.expiry = expiry
+    if tabu_list.hash_solutions:
+        tabu_list.visited = visited
+    stats = RunStats() if record_stats else None
+    first, best = scan_moves(_worker['decoder'], schedule, _worker['chunks'][index], tabu_list, it, best_makespan, current_hash, incremental, stats=stats)
+    return first, best, None if stats is None else stats.export()
+
+
+class NeighborhoodPool():
+    """Process pool scoring the pairwise-exchange neighbourhood in chunks.
+
+    The processing times, the move chunks and the Zobrist keys are handed to
+    every worker once; an iteration only sends the current schedule and the
+    live tabu entries, and gets back the best admissible move of each chunk
+    along with, when `stats` is given, the counters and timers of its scan.
+    """
+
+    def __init__(self, workers, processing_times, n, m, tabu_list):
+        moves = list(pairwise_exchange_neighborhood([[0]*n for _ in range(m)]))
+        size = -(-len(moves) // workers)
+        self.chunks = [moves[c:c+size] for c in range(0, len(moves), size)]
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_scoring_worker,
+                                        initargs=(processing_times, self.chunks, tabu_list))
+
+    def scan(self, schedule, tabu_list, it, best_makespan, current_hash=None, incremental=True, stats=None):
+        expiry = tabu_list.active(it)
+        visited = tabu_list.visited if tabu_list.hash_solutions else None
+        futures = [self.pool.submit(_score_chunk, c, schedule, it, best_makespan, expiry, visited, current_hash, incremental, stats is not None)
+                   for c in range(len(self.chunks))]
+        results = [future.result() for future in futures]
+        best = None
+        # chunks are merged in neighbourhood order, so ties resolve as in a serial scan
+        for _, chunk_best, chunk_stats in results:
+            if chunk_best is not None and (best is None or chunk_best[0] < best[0]):
+                best = chunk_best
+            if chunk_stats is not None:
+                stats.add(chunk_stats)
+        return results[0][0], best
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def uses_pool(workers, neighborhood):
+    # the critical neighbourhood is small enough to always be scanned serially
+    return resolve_workers(workers) > 1 and neighborhood == PAIRWISE
+
+
+def scan_cache(cache_size, workers, neighborhood):
+    """The fitness cache of a run, or None; the pool workers score moves
+    without one, so a parallel scan runs uncached rather than report an
+    idle cache."""
+    if not cache_size:
+        return None
+    if uses_pool(workers, neighborhood):
+        warnings.warn("the fitness cache is not used by parallel neighbourhood scans, running without it")
+        return None
+    return FitnessCache(cache_size)
+
+
+def tabu_search(n, m, processing_times, tabu_length, max_iterations, initial_solution, upper_bound, incremental=True, hash_solutions=False, cache=None, stopping=None, workers=1, neighborhood=PAIRWISE, stats=None):
+    decoder = Decoder(processing_times)
     best_solution = initial_solution
-    best_makespan = makespan(initial_solution, processing_times)[0]
-    current_solution = initial_solution
-    tabu_list = []
-    for it in stqdm(range(max_iterations),desc=f"Tabu Search: J{n}M{m} Tabu length:{tabu_length} "):
-        neighborhood = pairwise_exchange_neighborhood(current_solution)
-        best_neighbor = neighborhood[0]
-        best_neighbor_makespan = makespan(best_neighbor, processing_times)[0]
-        for neighbor in neighborhood[1:]:
-            neighbor_makespan = makespan(neighbor, processing_times)[0]
-            if neighbor_makespan < best_neighbor_makespan and neighbor not in tabu_list:
-                best_neighbor = neighbor
-                best_neighbor_makespan = neighbor_makespan
-        current_solution = best_neighbor
-        if best_neighbor_makespan < best_makespan:
-            best_solution = best_neighbor
-            best_makespan = best_neighbor_makespan
-        tabu_list.append(best_neighbor)
-        if len(tabu_list) > tabu_length:
-            tabu_list.pop(0)
-    return makespan(best_solution, processing_times)
-
-
-
-
-def run_tabu_search(n,m,processing_times,ub=0,lb=0,tabu_length=TABU_LENGTH, iterations=10000):
+    best_makespan = decoder.makespan(initial_solution)[0]
+    if stats is not None:
+        stats.count('decodes')
+        stats.best(0, best_makespan)
+    current_solution = [row[:] for row in initial_solution]
+    tabu_list = TabuList(tabu_length, n, m, hash_solutions=hash_solutions)
+    current_hash = None
+    if hash_solutions:
+        current_hash = tabu_list.hash(current_solution)
+        tabu_list.visit(current_hash)
+    # the workers keep no cache of their own, so `cache` only serves serial scans
+    pool = None
+    if uses_pool(workers, neighborhood):
+        pool = NeighborhoodPool(resolve_workers(workers), processing_times, n, m, tabu_list)
+    try:
+        for it in progress(range(max_iterations),desc=f"Tabu Search: J{n}M{m} Tabu length:{tabu_length} "):
+            if stopping is not None and stopping.update(it, best_makespan):
+                break
+            if stats is not None:
+                stats.count('iterations')
+                lap = time.perf_counter()
+            if pool is not None:
+                first, best = pool.scan(current_solution, tabu_list, it, best_makespan, current_hash, incremental, stats)
+                if stats is not None:
+                    # wall time of the scan; its phases are summed over the workers
+                    lap = stats.lap('pool', lap)
+            else:
+                if neighborhood == CRITICAL:
+                    moves = critical_neighborhood(decoder.critical_path(current_solution), n)
+                    if stats is not None:
+                        stats.count('decodes')
+                        lap = stats.lap('critical_path', lap)
+                else:
+                    moves = pairwise_exchange_neighborhood(current_solution)
+                first, best = scan_moves(decoder, current_solution, moves, tabu_list, it, best_makespan, current_hash, incremental, cache, stats)
+                if stats is not None:
+                    lap = time.perf_counter()
+            if best is None:
+                # every move is tabu, take the first one rather than stall
+                best = first
+                if stats is not None:
+                    stats.count('all_tabu')
+            best_neighbor_makespan, move, attribute, current_hash = best
+            swap_move(current_solution, move)
+            tabu_list.add(attribute, it)
+            if hash_solutions:
+                tabu_list.visit(current_hash)
+            if stats is not None:
+                lap = stats.lap('tabu', lap)
+            if best_neighbor_makespan < best_makespan:
+                best_solution = [row[:] for row in current_solution]
+                best_makespan = best_neighbor_makespan
+                if stats is not None:
+                    stats.lap('copy', lap)
+                    stats.best(it+1, best_makespan)
+    finally:
+        if pool is not None:
+            pool.close()
+    return decoder.makespan(best_solution)
+
+
+
+
+def run_tabu_search(n,m,processing_times,ub=0,lb=0,tabu_length=TABU_LENGTH, iterations=10000, cache_size=0, time_limit=None, patience=None, workers=1, neighborhood=PAIRWISE, stats=False):
     datas = []
-    start_time=time.time()
-    mspan, sequence = tabu_search(n, m, processing_times, TABU_LENGTH, iterations, scheduling(processing_times), ub)
-    end_time=time.time()
+    lb = max(lb, lower_bound(processing_times))
+    cache = scan_cache(cache_size, workers, neighborhood)
+    stopping = StoppingRule(time_limit=time_limit, lower_bound=lb, patience=patience)
+    start_time=time.perf_counter()
+    initial_solution = scheduling(processing_times)
+    solved = solved_by_heuristic(initial_solution, processing_times, lb)
+    if solved is not None:
+        mspan, sequence = solved
+        report = {'stop': HEURISTIC}
+    else:
+        run_stats = RunStats() if stats else None
+        mspan, sequence = tabu_search(n, m, processing_times, tabu_length, iterations, initial_solution, ub, cache=cache, stopping=stopping, workers=workers, neighborhood=neighborhood, stats=run_stats)
+        report = run_report(stopping, cache, run_stats)
+    end_time=time.perf_counter()
     datas.append({
         'n': int(n),  # Convert to int if n is a numpy int64
         'm': int(m),  # Convert to int if m is a numpy int64
@@ -171,20 +427,32 @@ def run_tabu_search(n,m,processing_times,ub=0,lb=0,tabu_length=TABU_LENGTH, iter
         'sequence': [int(seq) for seq in sequence],
         'runtime':end_time-start_time
     })
+    datas[0].update(merge_reports([report]))
     return datas[0]
 
 
-def run_tabu_search_tests(n,m,iterations=10000,save_location="results"):
-    datas = []
+def run_tabu_search_tests(n,m,iterations=10000,tabu_length=TABU_LENGTH,cache_size=0,time_limit=None,patience=None,workers=1,neighborhood=PAIRWISE,save_location="results",resume=False,stats=False):
     test_name=f"test{n}{m}"
-    for i in range(10):
-        instance_file = f"tests/{test_name}{str(i)}"
-        n, m, processing_times, ub, lb = read_instance(instance_file)
-        start_time = time.time()
-        mspan, sequence = tabu_search(n, m, processing_times, TABU_LENGTH, iterations, scheduling(processing_times), ub)
-        end_time = time.time()
-
-        datas.append({
+    sink = ResultSink(f"{save_location}/tabu_"+test_name+'.jsonl', resume=resume)
+    completed = sink.completed()
+    for i, (n, m, processing_times, ub, lb) in enumerate(load_test_instances(n, m)):
+        if i in completed:
+            continue
+        cache = scan_cache(cache_size, workers, neighborhood)
+        stopping = StoppingRule(time_limit=time_limit, lower_bound=lb, patience=patience)
+        start_time = time.perf_counter()
+        initial_solution = scheduling(processing_times)
+        solved = solved_by_heuristic(initial_solution, processing_times, lb)
+        if solved is not None:
+            mspan, sequence = solved
+            report = {'stop': HEURISTIC}
+        else:
+            run_stats = RunStats() if stats else None
+            mspan, sequence = tabu_search(n, m, processing_times, tabu_length, iterations, initial_solution, ub, cache=cache, stopping=stopping, workers=workers, neighborhood=neighborhood, stats=run_stats)
+            report = run_report(stopping, cache, run_stats)
+        end_time = time.perf_counter()
+
+        data = {
             'n': int(n),  # Convert to int if n is a numpy int64
             'm': int(m),  # Convert to int if m is a numpy int64
             'upperbound': int(ub),  # Convert to int if ub is a numpy int64
@@ -193,10 +461,11 @@ def run_tabu_search_tests(n,m,iterations=10000,save_location="results"):
             'makespan': int(mspan),  # Convert to int if mspan is a numpy int64
             'sequence': [int(seq) for seq in sequence],  # Convert each sequence element if they are numpy int64
             'runtime':end_time-start_time
-        })
+        }
+        data.update(merge_reports([report]))
+        sink.write(i, data)
 
-    with open(f"{save_location}/tabu_"+test_name+'.json', 'w') as f:
-        json.dump(datas, f)
+    sink.dump(f"{save_location}/tabu_"+test_name+'.json')
 
 
 
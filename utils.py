@@ -1,6 +1,6 @@
 import json
 import numpy as np
-from matplotlib import pyplot as plt
+from bounds import lower_bound
 
 
 TABU_SEARCH = 'TABU_SEARCH'
@@ -24,6 +24,7 @@ def load_simulated_anneling_data(n,m,load_location="results"):
     return data
 
 def display_stat_makespan_single_algorithm(algorithm, n, m,load_location="results"):
+    from matplotlib import pyplot as plt
     if algorithm == TABU_SEARCH:
         results = load_tabu_data(n, m,load_location=load_location)
     elif algorithm == SIMULATED_ANNEALING:
@@ -43,6 +44,7 @@ def display_stat_makespan_single_algorithm(algorithm, n, m,load_location="result
 
 
 def display_stat_makespan_all_algorithm(n, m,load_location="results"):
+    from matplotlib import pyplot as plt
     ts_results = load_tabu_data(n, m,load_location=load_location)
     sa_results = load_simulated_anneling_data(n, m,load_location=load_location)
     ga_results = load_genetic_data(n, m,load_location=load_location)
@@ -61,6 +63,7 @@ def display_stat_makespan_all_algorithm(n, m,load_location="results"):
 
 
 def display_stat_runtime(n, m,load_location="results"):
+    from matplotlib import pyplot as plt
     ts_results = load_tabu_data(n, m,load_location=load_location)
     sa_results = load_simulated_anneling_data(n, m,load_location=load_location)
     ga_results = load_genetic_data(n, m,load_location=load_location)
@@ -76,6 +79,7 @@ def display_stat_runtime(n, m,load_location="results"):
     return fig
 
 def visualize_schedule(algorithm_name, test_number, n, m, sequence, processing_times):
+    from matplotlib import pyplot as plt
     end_times = [0] * m  
     fig, ax = plt.subplots(figsize=(10, m))
     colors = plt.get_cmap('tab20')(np.linspace(0, 1, n))
@@ -120,6 +124,8 @@ def read_instance(filename):
             ub = lb = 0
     else:
         ub = lb = 0
+    # files without a footer (or with a weaker one) get the computed bound
+    lb = max(lb, lower_bound(processing_times))
     return n, m, processing_times, ub, lb
 
 
@@ -142,4 +148,6 @@ def read_instance_file(file):
             ub = lb = 0
     else:
         ub = lb = 0
+    # files without a footer (or with a weaker one) get the computed bound
+    lb = max(lb, lower_bound(processing_times))
     return n, m, processing_times, ub, lb
\ No newline at end of file